@@ -2,80 +2,256 @@ from shiny import App, ui, render, reactive
 import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
+import plotly.offline
 import numpy as np
 import pathlib
-import json
-import collections
-
-from metadata import OUR_TEAM_NUMBER, CURRENT_EVENT
-
-from utils import statbotics_utils, tba_utils
+import functools
+
+from metadata import OUR_TEAM_NUMBER, CURRENT_EVENT, CURRENT_EVENT_TYPE, SEASON_EVENTS
+
+from utils import component_opr, event_cache, match_simulator, pick_list, projected_rankings, reconciliation, scouting_utils, season_store, team_ratings, team_stats
+from utils.live_scouting import POLL_SECONDS, LiveMatchScouting
+from utils.figure_cache import FigureCache
+from utils.match_context import (
+    BLUE_COLOR,
+    RED_COLOR,
+    build_match_index,
+    build_prediction_index,
+    build_team_schedule,
+    create_match_context,
+)
 
 # read in data
 USE_LOCAL_VERSION = True
 
+# How many rendered figures to keep around. Each lineup has ~10 figures, so this covers roughly a dozen matches
+FIGURE_CACHE_SIZE = 128
+
+# The team profile columns the match preview shows for each team in the lineup
+LINEUP_CAPABILITY_COLUMNS = [
+    "driveBaseType",
+    "canScoreCoralL1",
+    "canScoreCoralL2",
+    "canScoreCoralL3",
+    "canScoreCoralL4",
+    "canScoreAlgaeProcessor",
+    "canScoreAlgaeNet",
+    "canPickupCoralGround",
+    "canPickupAlgaeGround",
+    "CageClimb",
+    "matchesScouted",
+    "totalPointsScored",
+]
+
+# How plotly.js gets to the browser.
+#   "local": the app serves the plotly.js bundled with the plotly package, loaded once by the page. Each figure only
+#            ships its json, and it works without internet (pit laptops, the shinylive build)
+#   "cdn": the same, but the page loads plotly.js from cdn.plot.ly
+#   "inline": every figure embeds its own copy of the ~3.5 MB plotly.js bundle
+PLOTLY_JS_MODE = "local"
+PLOTLY_JS_FILE = pathlib.Path(plotly.__file__).resolve().parent / "package_data" / "plotly.min.js"
+# Versioned, so browsers can cache it for as long as the plotly package doesn't change
+PLOTLY_JS_ROUTE = f"plotly-{plotly.offline.get_plotlyjs_version()}.min.js"
+PLOTLY_JS_CDN_URL = f"https://cdn.plot.ly/{PLOTLY_JS_ROUTE}"
+
 if USE_LOCAL_VERSION:
     script_directory = pathlib.Path(__file__).resolve().parent
     base_data_directory = script_directory / f"data/{CURRENT_EVENT}"
     print(f"Loading local data from: {base_data_directory}")
 
-    df = pd.read_csv(base_data_directory / "match_scouting.csv")
-    matches_df = tba_utils.load_event_matches(base_data_directory / "tba_matches.json")
-    statbotics_df = statbotics_utils.load_statbotics_matches(base_data_directory / "statbotics_matches.json")
+    def load_event_frame(name):
+        return event_cache.load_event_frame(base_data_directory, name)
+
+    def load_season_frame(event, name):
+        return event_cache.load_event_frame(base_data_directory.parent / event, name)
 else:
     branch_name = "main"
-    base_url = f"https://raw.githubusercontent.com/GirlsOfSteelRobotics/gos_scouting_report/refs/heads/{branch_name}/data/{CURRENT_EVENT}"
+    data_url = f"https://raw.githubusercontent.com/GirlsOfSteelRobotics/gos_scouting_report/refs/heads/{branch_name}/data"
+    base_url = f"{data_url}/{CURRENT_EVENT}"
     print(f"Loading remote data from {base_url}")
 
-    from pyodide.http import open_url
+    def load_event_frame(name):
+        return event_cache.load_remote_event_frame(base_url, name)
 
-    scouted_csv = open_url(base_url + "/match_scouting.csv")
-    tba_matches_json = json.load(open_url(base_url + "/tba_matches.json"))
-    statbotics_matches_json = json.load(open_url(base_url + "/statbotics_matches.json"))
-    
-    df = pd.read_csv(scouted_csv)
-    matches_df = tba_utils.event_matches_json_to_dataframe(tba_matches_json)
-    statbotics_df = statbotics_utils.statbotics_matches_json_to_dataframe(statbotics_matches_json)
+    def load_season_frame(event, name):
+        return event_cache.load_remote_event_frame(f"{data_url}/{event}", name)
+
+# Every tab needs the scouting data and the schedule, so they are loaded up front. Running locally, new rows of
+# match_scouting.csv are picked up while the app is running
+scouting = LiveMatchScouting(
+    load_event_frame("match_scouting"), base_data_directory / "match_scouting.csv" if USE_LOCAL_VERSION else None
+)
+matches_df = load_event_frame("tba_matches")
+
+# match number -> lineup, so selecting a match is a dictionary lookup
+match_index = build_match_index(matches_df)
+
+# team -> the match numbers they play in, so filtering by team is a dictionary lookup too
+team_schedule = build_team_schedule(matches_df)
+
+
+# The rest of the data is only loaded the first time something shows it, so it doesn't hold up the first page load.
+# It is shared by every session.
+@functools.cache
+def get_statbotics_df():
+    return load_event_frame("statbotics_matches")
+
+
+@functools.cache
+def get_prediction_index():
+    return build_prediction_index(match_index, get_statbotics_df())
+
+
+@functools.cache
+def get_pit_scouting_df():
+    return load_event_frame("pit_scouting")
+
+
+@functools.cache
+def get_statbotics_teams_df():
+    return load_event_frame("statbotics_teams")
+
+
+def cached_per_data_version(func):
+    """
+    Like functools.cache, but built again the first time it is called after new scouting data comes in.
+    """
+    cached = functools.lru_cache(maxsize=1)(lambda version: func())
+
+    @functools.wraps(func)
+    def wrapper():
+        return cached(scouting.version)
+
+    return wrapper
+
+
+# pit data joined with the scouted averages, indexed by team number
+@cached_per_data_version
+def get_team_profiles():
+    return scouting_utils.build_team_profiles(scouting.team_aggregates, get_pit_scouting_df())
 
-# add new columns
-df["totalTeleopCoral"] = df["teleopCoralL1"] + df["teleopCoralL2"] + df["teleopCoralL3"] + df["teleopCoralL4"]
-df["totalAutoCoral"] = df["autoCoralL1"] + df["autoCoralL2"] + df["autoCoralL3"] + df["autoCoralL4"]
 
-df["totalTeleopCoralPoints"] = df["teleopCoralL1"]*2 + df["teleopCoralL2"]*3 + df["teleopCoralL3"]*4 + df["teleopCoralL4"]*5
-df["totalTeleopAlgaePoints"] = df["teleopAlgaeNet"]*4 + df["teleopAlgaeProc"]*6
-df["totalTeleopPoints"] = df["totalTeleopCoralPoints"] + df["totalTeleopAlgaePoints"]
+# every event of the season, for looking up what teams did before they got here
+@functools.cache
+def get_season_store():
+    return season_store.build_season_store(SEASON_EVENTS, load_season_frame)
 
-df["totalAutoCoralPoints"] = df["autoCoralL1"]*3 + df["autoCoralL2"]*4 + df["autoCoralL3"]*6 + df["autoCoralL4"]*7
-df["totalAutoAlgaePoints"] = df["autoAlgaeNet"]*4 + df["autoAlgaeProc"]*6
-df["totalAutoPoints"] = df["totalAutoCoralPoints"] + df["totalAutoAlgaePoints"]
 
-df["algaeTeleop"] = df["teleopAlgaeNet"] + df["teleopAlgaeProc"]
-df["algaeAuto"] = df["autoAlgaeNet"] + df["autoAlgaeProc"]
+# rendered figures are cached by lineup, and thrown away when the scouting data changes
+figure_cache = FigureCache(FIGURE_CACHE_SIZE)
 
-df["totalPieces"] = df["totalTeleopCoral"] + df["totalAutoCoral"] + df["algaeTeleop"] + df["algaeAuto"] 
 
-position = df["bargeStatus"]
-df["endgamePoints"] = np.where(position == "Parked", 2, np.where(position == "Shallow Cage", 6, np.where(position == "Deep Cage", 12, 0)))
+# Monte Carlo match outcomes, sampled from every team's scouted matches
+@cached_per_data_version
+def get_scouting_samples():
+    return match_simulator.build_scouting_samples(scouting.df, fallback=get_unscouted_fallback())
 
-df["endgamePlusAuto"] = df["totalAutoPoints"] + df["totalEndgamePoints"]
 
-df["totalPointsScored"] = df["totalTeleopPoints"] + df["totalAutoPoints"] + df["endgamePoints"]
+# The bonus RP thresholds depend on the event type, checked against the bonus RP TBA gave the played matches
+@functools.cache
+def get_rp_rules():
+    return match_simulator.calibrate_rp_rules(matches_df, match_simulator.RP_RULES[CURRENT_EVENT_TYPE])
+
+
+@cached_per_data_version
+def get_schedule_simulation():
+    return match_simulator.simulate_schedule(get_scouting_samples(), match_index, seed=0, rules=get_rp_rules())
+
+
+@cached_per_data_version
+def get_projected_rankings():
+    return projected_rankings.project_rankings(matches_df, get_scouting_samples(), seed=0, rules=get_rp_rules())
+
+
+# Shared by every session, so the scores it has cached carry over between scouts following the draft
+@cached_per_data_version
+def get_pick_list():
+    return pick_list.PickList(
+        scouting.df,
+        algae_capacity=pick_list.algae_capacity_from_results(matches_df),
+        fallback=get_unscouted_fallback(),
+    )
+
+
+# Recency weighted ratings. They are updated with the new scouting rows instead of being rebuilt
+@functools.cache
+def get_team_ratings():
+    return team_ratings.compute_team_ratings(scouting.df)
+
+
+def update_team_ratings(update):
+    if update.full_reload:
+        get_team_ratings.cache_clear()
+    elif get_team_ratings.cache_info().currsize:
+        get_team_ratings().update(update.new_rows)
+
+
+scouting.add_listener(update_team_ratings)
+
+
+# Our scouting checked against the official TBA score breakdowns
+@cached_per_data_version
+def get_reconciliation():
+    return reconciliation.reconcile(scouting.df, matches_df)
+
+
+# Outlier resistant stats and confidence intervals, for comparing teams across the whole event
+@cached_per_data_version
+def get_team_stats():
+    return team_stats.compute_team_stats(scouting.df)
+
+
+@cached_per_data_version
+def get_alliance_selection_df():
+    stats = get_team_stats()
+    robust = stats["trimmed_mean"]
+
+    return pd.concat([
+        robust,
+        (stats["ci_high"] - robust).add_suffix("_ci_plus"),
+        (robust - stats["ci_low"]).add_suffix("_ci_minus"),
+    ], axis=1).reset_index()
+
+# Each team's contribution to every score breakdown component, from the TBA results alone. Doesn't depend on our
+# scouting, so it stands in for teams we haven't scouted
+@functools.cache
+def get_component_opr():
+    return component_opr.compute_component_opr(matches_df)
+
+
+# The scouted averages checked against the component OPR
+@cached_per_data_version
+def get_opr_comparison():
+    return component_opr.compare_with_scouting(get_component_opr(), scouting.team_aggregates)
 
-# update team name
-df["team_key"] = df["team_key"].str[3:]
 
 def create_mock_data_for_missing_teams(teams_with_no_data):
-    data = collections.defaultdict(list)
+    return component_opr.opr_scouting_rows(get_component_opr(), sorted(teams_with_no_data), scouting.df)
+
 
-    for team in teams_with_no_data:
-        for key in df.columns:
-            data[key].append(0)
-        data["team_key"][-1] = team
-        data["bargeStatus"][-1] = "Not Parked"
-    return pd.DataFrame(data)
+# Stand in rows for every team in the schedule that hasn't been scouted, so the simulations play them like their
+# component OPR rather than as robots that do nothing
+@cached_per_data_version
+def get_unscouted_fallback():
+    return create_mock_data_for_missing_teams(set(team_schedule).difference(get_scouted_teams()))
+
+
+def get_scouted_teams():
+    return [str(team) for team in scouting.df["team_key"].unique()]
+
+
+def plotly_html(fig):
+    return ui.HTML(fig.to_html(full_html=False, include_plotlyjs=PLOTLY_JS_MODE == "inline"))
+
+
+def plotly_js_head():
+    # Relative, so it also resolves when the app isn't served from the root of the site
+    if PLOTLY_JS_MODE == "local":
+        return ui.head_content(ui.tags.script(src=PLOTLY_JS_ROUTE))
+    if PLOTLY_JS_MODE == "cdn":
+        return ui.head_content(ui.tags.script(src=PLOTLY_JS_CDN_URL))
+    return None
 
-df_unique_teams = df.drop_duplicates(subset=['team_key'], keep='first')
-# print(df_unique_teams.keys())
 # Define the UI
 app_ui = ui.page_navbar(
 ui.nav_panel(
@@ -104,6 +280,17 @@ ui.page_sidebar(
                 ui.output_ui("blue_statbotics_prediction")
             )    
         ),
+        ui.layout_column_wrap(
+            ui.card(
+                ui.output_ui("red_simulation_box")
+            ),
+            ui.card(
+                ui.output_ui("blue_simulation_box")
+            )
+        ),
+        ui.card(
+            ui.output_ui("simulated_scores_histogram")
+        ),
         ui.layout_column_wrap(
             ui.card(
                 ui.output_ui("avg_coral_red_box")
@@ -120,6 +307,9 @@ ui.page_sidebar(
                 ui.output_ui("avg_endgame_blue_box")
             ),
         ),
+        ui.card(
+            ui.output_data_frame("lineup_capabilities_dt")
+        ),
         ui.card(
             ui.output_data_frame("statbotics_dataframe")
         ),
@@ -174,8 +364,28 @@ ui.page_sidebar(
             ui.output_ui("pieces_scatter")
         ),
         ui.card(
+            ui.h5(f"Pick List for {OUR_TEAM_NUMBER}"),
+            ui.layout_column_wrap(
+                ui.input_selectize("pick_list_alliance", "Already on our alliance", choices=sorted(get_scouted_teams(), key=int), multiple=True),
+                ui.input_selectize("pick_list_unavailable", "Picked by other alliances / declined", choices=sorted(get_scouted_teams(), key=int), multiple=True),
+            ),
+            ui.output_data_frame("pick_list_dt")
+        ),
+        ui.card(
+            ui.output_ui("projected_rankings_title"),
+            ui.output_data_frame("projected_rankings_dt")
+        ),
+        ui.card(
+            ui.input_select("key_stats_metric", "Metric", choices=team_stats.TEAM_STAT_METRICS),
             ui.output_data_frame("key_stats_dt")
         ),
+        ui.card(
+            ui.card_header("Recency Weighted Ratings vs Statbotics EPA"),
+            ui.output_data_frame("team_ratings_dt")
+        ),
+        ui.card(
+            ui.output_data_frame("key_averages_dt")
+        ),
     ),
 
     ui.nav_panel(
@@ -192,30 +402,87 @@ ui.page_sidebar(
             ),
             ui.card(
             ui.output_data_frame("key_stats_by_team_dt")
+            ),
+            ui.card(
+            ui.output_data_frame("team_schedule_dt")
+            ),
+            ui.card(
+            ui.output_data_frame("pit_scouting_dt")
+            ),
+            ui.card(
+            ui.card_header("Season History"),
+            ui.output_data_frame("team_season_dt")
             )
             
         )    
     
     ),
+    ui.nav_panel(
+        "Pre-Scouting",
+        ui.card(
+            ui.card_header("What earlier events tell us about the teams at this event"),
+            ui.input_switch("prescouting_unseen_only", "Only teams without scouting data here", True),
+            ui.output_data_frame("prescouting_dt")
+        ),
+    ),
+    ui.nav_panel(
+        "Data Quality",
+        ui.card(
+            ui.output_ui("reconciliation_summary"),
+            ui.output_data_frame("flagged_alliances_dt")
+        ),
+        ui.card(
+            ui.card_header("Robots whose barge status or auto line doesn't match TBA"),
+            ui.output_data_frame("flagged_robots_dt")
+        ),
+        ui.card(
+            ui.card_header("Scouting bias per team (per match, subtract to correct)"),
+            ui.output_data_frame("team_bias_dt")
+        ),
+        ui.card(
+            ui.card_header("Scouted averages vs component OPR from the TBA results (scouted - OPR)"),
+            ui.output_data_frame("opr_comparison_dt")
+        ),
+    ),
+    header=plotly_js_head(),
     title="GoS REEFSCAPE Data Science Report",
 )
 
 def server(input, output, session):
+    # Checks match_scouting.csv for new rows. Everything that shows scouting data calls this, so when new data comes
+    # in only those outputs are rendered again
+    @reactive.poll(scouting.signature, POLL_SECONDS)
+    def scouting_version():
+        update = scouting.refresh()
+        if update is not None and not update.full_reload:
+            ui.notification_show(f"Loaded {len(update.new_rows)} new scouting rows", duration=10)
+        return scouting.version
+
+    # Teams scouted after the app started are added to the team pickers, keeping whatever is already selected. The
+    # pickers that aren't on the page yet pick up the new teams when they are rendered
+    @reactive.effect
+    def update_team_choices():
+        scouting_version()
+        team_numbers = sorted(get_scouted_teams(), key=int)
+
+        with reactive.isolate():
+            for input_id in ["pick_list_alliance", "pick_list_unavailable"]:
+                if input[input_id].is_set():
+                    ui.update_selectize(input_id, choices=team_numbers, selected=list(input[input_id]()))
+            for input_id in ["team_select", "red1", "red2", "red3", "blue1", "blue2", "blue3"]:
+                if input[input_id].is_set():
+                    ui.update_select(input_id, choices=team_numbers, selected=input[input_id]())
+
     # upcoming alliance lineup
     def color_picker(team_num):
-        new_df, color_map, red_teams, blue_teams, all_teams, averages_by_team, averages_by_team_all = get_match_data()
-        if team_num in red_teams:
-            return "red"
-        else:
-            return "blue"
+        return get_match_data().alliance[team_num]
 
     @reactive.calc
     def get_match_data():
         if input.match_or_team() == "Match Number":
-            match_num = int(input.match_select())
-            match_data = matches_df[matches_df["match_number"] == match_num].reset_index()
-            red_teams = [match_data["red1"][0][3:], match_data["red2"][0][3:], match_data["red3"][0][3:]]
-            blue_teams = [match_data["blue1"][0][3:], match_data["blue2"][0][3:], match_data["blue3"][0][3:]]
+            lineup = match_index[int(input.match_select())]
+            red_teams = list(lineup.red_teams)
+            blue_teams = list(lineup.blue_teams)
         else:
             red_teams = [input.red1(), input.red2(), input.red3()]
             blue_teams = [input.blue1(), input.blue2(), input.blue3()]
@@ -223,41 +490,70 @@ def server(input, output, session):
 
         all_teams = red_teams + blue_teams
 
+        scouting_version()
+
         # filter df by team_key
+        df = scouting.df
         new_df = df.loc[df["team_key"].isin(all_teams)]
         teams_with_no_data = set(all_teams).difference(set(new_df["team_key"]))
+        mock_data = None
         if teams_with_no_data:
             ui.notification_show(
-                f"This match contains teams that have no scouting data",
+                f"This match contains teams that have no scouting data, their component OPR is shown instead",
                 type="warning",
                 duration=None,
             )
-            new_df = pd.concat([new_df, create_mock_data_for_missing_teams(teams_with_no_data)])
-        new_df["colorGroup"] = new_df["team_key"].apply(lambda x: "Red" if x in red_teams else "Blue")
-        
-        # averages df
-        averages_by_team = new_df.groupby("team_key").mean(numeric_only=True).reset_index()
-        averages_by_team_all = df.groupby("team_key").mean(numeric_only=True).reset_index()
+            mock_data = create_mock_data_for_missing_teams(teams_with_no_data)
+            new_df = pd.concat([new_df, mock_data])
+
+        # averages df, already sorted by all_teams
+        averages_by_team = scouting_utils.team_averages(scouting.team_aggregates, all_teams, fallback=mock_data)
 
         # Sort data
-        averages_by_team = averages_by_team.set_index("team_key").loc[all_teams].reset_index()
         new_df = new_df.set_index("team_key").loc[all_teams].reset_index()
+        new_df["colorGroup"] = np.where(new_df["team_key"].isin(red_teams), "Red", "Blue")
+
+        return create_match_context(red_teams, blue_teams, new_df, averages_by_team)
+
+    @reactive.calc
+    def simulate_selected_match():
+        match = get_match_data()
+        # Seeded, so flipping back to a lineup shows the same numbers
+        return match_simulator.simulate_match(
+            get_scouting_samples(), match.red_teams, match.blue_teams, seed=0, rules=get_rp_rules()
+        )
+
+    def simulation_box(color):
+        simulation = simulate_selected_match()
+        win_probability = getattr(simulation, f"{color}_win_probability")
+        rp_probabilities = getattr(simulation, f"{color}_rp_probabilities")
+        expected_rp = getattr(simulation, f"{color}_expected_rp")
+
+        return ui.value_box(
+            f"Simulated Win Probability {color.upper()}",
+            f"{win_probability:.0%}",
+            ui.p(f"Expected RP: {expected_rp:.2f}"),
+            ui.p(", ".join(f"{name.capitalize()} RP: {probability:.0%}" for name, probability in rp_probabilities.items())),
+        )
 
-        color_map = {str(team): "#FF5733" for team in red_teams}  # Red teams
-        color_map.update({str(team): "#1F77B4" for team in blue_teams})  # Blue teams
+    def lineup_cache_key():
+        match = get_match_data()
+        return match.red_teams, match.blue_teams, scouting_version()
 
-        return new_df, color_map, red_teams, blue_teams, all_teams, averages_by_team, averages_by_team_all
+    def event_cache_key():
+        return (scouting_version(),)
 
     @output
     @render.ui
+    @figure_cache.cached(lineup_cache_key)
     def total_points_boxplot():
-        new_df, color_map, red_teams, blue_teams, all_teams, averages_by_team, averages_by_team_all = get_match_data()
-        fig = px.box(new_df, 
+        match = get_match_data()
+        fig = px.box(match.scouted, 
                     x="team_key", 
                     y="totalPointsScored", 
                     color="team_key",
-                    category_orders={"team_key": new_df["team_key"].tolist()},  # Ensure x-axis is ordered
-                    color_discrete_map=color_map
+                    category_orders={"team_key": match.scouted["team_key"].tolist()},  # Ensure x-axis is ordered
+                    color_discrete_map=match.color_map
                     )
 
         # Step 6: Update x-axis labels if needed
@@ -265,22 +561,23 @@ def server(input, output, session):
             xaxis=dict(
                 title="Team",
                 tickmode="array",
-                tickvals=new_df["team_key"].tolist(),
-                ticktext=new_df["team_key"].tolist(),
+                tickvals=match.scouted["team_key"].tolist(),
+                ticktext=match.scouted["team_key"].tolist(),
                 tickfont=dict(size=14)
             )
         )
     
-        return ui.HTML(fig.to_html(full_html=False))
+        return plotly_html(fig)
 
     @output
     @render.ui
+    @figure_cache.cached(lineup_cache_key)
     def coral_algae_teleop_scatter():
-        new_df, color_map, red_teams, blue_teams, all_teams, averages_by_team, averages_by_team_all = get_match_data()
+        match = get_match_data()
 
-        x = averages_by_team["algaeTeleop"]
-        y = averages_by_team["totalTeleopCoral"]
-        teams = averages_by_team["team_key"]
+        x = match.averages["algaeTeleop"]
+        y = match.averages["totalTeleopCoral"]
+        teams = match.averages["team_key"]
 
         fig = px.scatter(x=x, y=y, text=teams, labels={'x': "Avg Algae Scored", 'y': "Avg Coral Scored"},
                         title="Algae vs Coral TELEOP")
@@ -290,15 +587,16 @@ def server(input, output, session):
                                     symbol='circle', size=10),
                         textposition="middle left")
 
-        return ui.HTML(fig.to_html(full_html=False))
+        return plotly_html(fig)
     
     @output
     @render.ui
+    @figure_cache.cached(lineup_cache_key)
     def teleop_auto_points_scatter():
-        new_df, color_map, red_teams, blue_teams, all_teams, averages_by_team, averages_by_team_all = get_match_data()
-        teams = averages_by_team["team_key"]
-        x = averages_by_team["totalTeleopPoints"]
-        y = averages_by_team["totalAutoPoints"]
+        match = get_match_data()
+        teams = match.averages["team_key"]
+        x = match.averages["totalTeleopPoints"]
+        y = match.averages["totalAutoPoints"]
 
         # Create the plot
         fig = px.scatter(x=x, y=y, text=teams, labels={'x': "totalTeleopPoints", 'y': "totalAutoPoints"},
@@ -310,32 +608,23 @@ def server(input, output, session):
                                     symbol='circle', size=10),
                         textposition="middle left")
         
-        return ui.HTML(fig.to_html(full_html=False))
+        return plotly_html(fig)
     
     @output
     @render.ui
+    @figure_cache.cached(lineup_cache_key)
     def net_processor_teleop():
-        new_df, color_map, red_teams, blue_teams, all_teams, averages_by_team, averages_by_team_all = get_match_data()
-
-        # Step 1: Convert team_keys to string
-        averages_by_team["team_key"] = averages_by_team["team_key"].astype(str)
+        match = get_match_data()
 
-        # Step 2: Sort teams by colorGroup (if needed)
-        averages_by_team["colorGroup"] = averages_by_team["team_key"].apply(lambda x: "Red" if x in red_teams else "Blue")
+        # Step 1: Define x-axis values
+        x = match.averages["team_key"]
+        y1 = match.averages["teleopAlgaeNet"]
+        y2 = match.averages["teleopAlgaeProc"]
 
-        # Step 3: Define x-axis values
-        x = averages_by_team["team_key"]
-        y1 = averages_by_team["teleopAlgaeNet"]
-        y2 = averages_by_team["teleopAlgaeProc"]
+        # Step 2: Generate colored tick labels
+        ticktext = [f'<span style="color:{match.color_map[team]};">{team}</span>' for team in x]
 
-        # Step 4: Define colors for x-axis labels
-        color_map = {str(team): "#FF5733" for team in red_teams}  # Red teams
-        color_map.update({str(team): "#1F77B4" for team in blue_teams})  # Blue teams
-
-        # Generate colored tick labels
-        ticktext = [f'<span style="color:{color_map[team]};">{team}</span>' for team in x]
-
-        # Step 5: Create the bar chart
+        # Step 3: Create the bar chart
         fig = go.Figure()
 
         fig.add_trace(go.Bar(
@@ -352,13 +641,13 @@ def server(input, output, session):
             marker=dict(color="#FFB480", line=dict(color="white", width=1))
         ))
 
-        # Step 6: Update layout with grouped colored x-axis labels
+        # Step 4: Update layout with grouped colored x-axis labels
         fig.update_layout(
             barmode="stack",
             xaxis=dict(
                 title="Team",
                 tickmode="array",
-                tickvals=all_teams,
+                tickvals=match.all_teams,
                 ticktext=ticktext,  # Apply colored labels
                 tickfont=dict(size=14)  # Adjust font size if needed
             ),
@@ -369,35 +658,36 @@ def server(input, output, session):
         )
 
 
-        return ui.HTML(fig.to_html(full_html=False)) 
+        return plotly_html(fig) 
 
     @output
     @render.ui
+    @figure_cache.cached(lineup_cache_key)
     def coral_algae_auto_scatter():
-        new_df, color_map, red_teams, blue_teams, all_teams, averages_by_team, averages_by_team_all = get_match_data()
+        match = get_match_data()
 
-        x = averages_by_team["algaeAuto"]
-        y = averages_by_team["totalAutoCoral"]
-        teams = averages_by_team["team_key"]
+        x = match.averages["algaeAuto"]
+        y = match.averages["totalAutoCoral"]
+        teams = match.averages["team_key"]
 
         fig = px.scatter(x=x, y=y, text=teams, labels={'x': "Avg Algae Scored", 'y': "Avg Coral Scored in Net"}, title="Coral vs Algae AUTO")
 
         colors = [color_picker(team) for team in teams]  # Apply color_picker correctly
         fig.update_traces(marker=dict(color=colors, symbol='circle', size=10), textposition="middle left") 
-        return ui.HTML(fig.to_html(full_html=False)) 
+        return plotly_html(fig) 
 
     @output
     @render.ui
+    @figure_cache.cached(lineup_cache_key)
     def coral_level_distribution_teleop_bar():
-        new_df, color_map, red_teams, blue_teams, all_teams, averages_by_team, averages_by_team_all = get_match_data()
+        match = get_match_data()
 
         # coral level distribution -- stacked bar graph
-        averages_by_team["team_key"] = averages_by_team["team_key"].astype(str)
-        x = averages_by_team["team_key"]
-        y1 = averages_by_team["teleopCoralL1"]
-        y2 = averages_by_team["teleopCoralL2"]
-        y3 = averages_by_team["teleopCoralL3"]
-        y4 = averages_by_team["teleopCoralL4"]
+        x = match.averages["team_key"]
+        y1 = match.averages["teleopCoralL1"]
+        y2 = match.averages["teleopCoralL2"]
+        y3 = match.averages["teleopCoralL3"]
+        y4 = match.averages["teleopCoralL4"]
 
         fig = go.Figure()
 
@@ -429,14 +719,14 @@ def server(input, output, session):
             marker=dict(color="#FFE493", line=dict(color="white", width=1))
         ))
         
-        ticktext = [f'<span style="color:{color_map[team]};">{team}</span>' for team in x]
+        ticktext = [f'<span style="color:{match.color_map[team]};">{team}</span>' for team in x]
 
         fig.update_layout(
             barmode="stack",  # Stack the bars
             xaxis=dict(
                 title="Team",
                 tickmode="array",
-                tickvals=all_teams,
+                tickvals=match.all_teams,
                 ticktext= ticktext,
                 tickfont=dict(size=14)  # Adjust font size if needed
             ),
@@ -446,19 +736,19 @@ def server(input, output, session):
             template="plotly_white"
         )
 
-        return ui.HTML(fig.to_html(full_html=False)) 
+        return plotly_html(fig) 
     @output
     @render.ui
+    @figure_cache.cached(lineup_cache_key)
     def coral_level_distribution_auto_bar():
-        new_df, color_map, red_teams, blue_teams, all_teams, averages_by_team, averages_by_team_all = get_match_data()
+        match = get_match_data()
 
         # coral level distribution -- stacked bar graph
-        averages_by_team["team_key"] = averages_by_team["team_key"].astype(str)
-        x = averages_by_team["team_key"]
-        y1 = averages_by_team["autoCoralL1"]
-        y2 = averages_by_team["autoCoralL2"]
-        y3 = averages_by_team["autoCoralL3"]
-        y4 = averages_by_team["autoCoralL4"]
+        x = match.averages["team_key"]
+        y1 = match.averages["autoCoralL1"]
+        y2 = match.averages["autoCoralL2"]
+        y3 = match.averages["autoCoralL3"]
+        y4 = match.averages["autoCoralL4"]
 
         fig = go.Figure()
 
@@ -491,15 +781,15 @@ def server(input, output, session):
         ))
 
         ticktext = [
-        f"<span style='color:{'red' if team in red_teams else 'blue'}'>{team}</span>"
-        for team in all_teams
+        f"<span style='color:{match.alliance[team]}'>{team}</span>"
+        for team in match.all_teams
         ]
         fig.update_layout(
             barmode="stack",  # Stack the bars
             xaxis=dict(
                 title="Team",
                 tickmode="array",
-                tickvals=all_teams,
+                tickvals=match.all_teams,
                 ticktext= ticktext,
                 tickfont=dict(size=14)  # Adjust font size if needed
             ),
@@ -509,20 +799,20 @@ def server(input, output, session):
             template="plotly_white"
         )
 
-        return ui.HTML(fig.to_html(full_html=False)) 
+        return plotly_html(fig) 
 
     @output
     @render.ui
+    @figure_cache.cached(lineup_cache_key)
     def coral_point_distribution_teleop_bar():
-        new_df, color_map, red_teams, blue_teams, all_teams, averages_by_team, averages_by_team_all = get_match_data()
+        match = get_match_data()
 
         # coral level distribution -- stacked bar graph
-        averages_by_team["team_key"] = averages_by_team["team_key"].astype(str)
-        x = averages_by_team["team_key"]
-        y1 = averages_by_team["teleopCoralL1"]*2
-        y2 = averages_by_team["teleopCoralL2"]*3
-        y3 = averages_by_team["teleopCoralL3"]*4
-        y4 = averages_by_team["teleopCoralL4"]*5
+        x = match.averages["team_key"]
+        y1 = match.averages["teleopCoralL1Points"]
+        y2 = match.averages["teleopCoralL2Points"]
+        y3 = match.averages["teleopCoralL3Points"]
+        y4 = match.averages["teleopCoralL4Points"]
 
         fig = go.Figure()
 
@@ -554,15 +844,15 @@ def server(input, output, session):
             marker=dict(color="#FFE493", line=dict(color="white", width=1))
         ))
         ticktext = [
-        f"<span style='color:{'red' if team in red_teams else 'blue'}'>{team}</span>"
-        for team in all_teams
+        f"<span style='color:{match.alliance[team]}'>{team}</span>"
+        for team in match.all_teams
         ]
         fig.update_layout(
             barmode="stack",  # Stack the bars
             xaxis=dict(
                 title="Team",
                 tickmode="array",
-                tickvals=all_teams,
+                tickvals=match.all_teams,
                 ticktext= ticktext,
                 tickfont=dict(size=14)  # Adjust font size if needed
             ),
@@ -571,19 +861,19 @@ def server(input, output, session):
             legend_title="Coral Levels",
             template="plotly_white"
         )
-        return ui.HTML(fig.to_html(full_html=False))
+        return plotly_html(fig)
 
     @output
     @render.ui
+    @figure_cache.cached(lineup_cache_key)
     def coral_point_distribution_auto_bar():
-        new_df, color_map, red_teams, blue_teams, all_teams, averages_by_team, averages_by_team_all = get_match_data()
+        match = get_match_data()
 
-        averages_by_team["team_key"] = averages_by_team["team_key"].astype(str)
-        x = averages_by_team["team_key"]
-        y1 = averages_by_team["autoCoralL1"]*3
-        y2 = averages_by_team["autoCoralL2"]*4
-        y3 = averages_by_team["autoCoralL3"]*6
-        y4 = averages_by_team["autoCoralL4"]*7
+        x = match.averages["team_key"]
+        y1 = match.averages["autoCoralL1Points"]
+        y2 = match.averages["autoCoralL2Points"]
+        y3 = match.averages["autoCoralL3Points"]
+        y4 = match.averages["autoCoralL4Points"]
 
         fig = go.Figure()
 
@@ -615,15 +905,15 @@ def server(input, output, session):
             marker=dict(color="#FFE493", line=dict(color="white", width=1))
         ))
         ticktext = [
-        f"<span style='color:{'red' if team in red_teams else 'blue'}'>{team}</span>"
-        for team in all_teams
+        f"<span style='color:{match.alliance[team]}'>{team}</span>"
+        for team in match.all_teams
         ]
         fig.update_layout(
             barmode="stack",  # Stack the bars
             xaxis=dict(
                 title="Team",
                 tickmode="array",
-                tickvals=all_teams,
+                tickvals=match.all_teams,
                 ticktext= ticktext,
                 tickfont=dict(size=14)  # Adjust font size if needed
             ),
@@ -632,14 +922,15 @@ def server(input, output, session):
             legend_title="Coral Levels",
             template="plotly_white"
         )
-        return ui.HTML(fig.to_html(full_html=False)) 
+        return plotly_html(fig) 
       
     @output
     @render.ui
+    @figure_cache.cached(lineup_cache_key)
     def endgame_bar():
-        new_df, color_map, red_teams, blue_teams, all_teams, averages_by_team, averages_by_team_all = get_match_data()
-        endgame_df = new_df.groupby('team_key')['bargeStatus'].value_counts().unstack(fill_value=0).reset_index()
-        endgame_df = endgame_df.set_index("team_key").loc[all_teams].reset_index()
+        match = get_match_data()
+        endgame_df = match.scouted.groupby('team_key')['bargeStatus'].value_counts().unstack(fill_value=0).reset_index()
+        endgame_df = endgame_df.set_index("team_key").loc[list(match.all_teams)].reset_index()
         
         # Populate data if the columns don't exist
         if 'Parked' not in endgame_df.columns:
@@ -686,8 +977,8 @@ def server(input, output, session):
         ))
 
         ticktext = [
-        f"<span style='color:{'red' if team in red_teams else 'blue'}'>{team}</span>"
-        for team in all_teams
+        f"<span style='color:{match.alliance[team]}'>{team}</span>"
+        for team in match.all_teams
         ]
         # Update layout for stacking and aesthetics
         fig.update_layout(
@@ -695,7 +986,7 @@ def server(input, output, session):
             xaxis=dict(
                 title="Team",
                 tickmode="array",
-                tickvals=all_teams,
+                tickvals=match.all_teams,
                 ticktext= ticktext,
                 tickfont=dict(size=14)  # Adjust font size if needed
             ),
@@ -704,20 +995,72 @@ def server(input, output, session):
             legend_title="Status Levels",
             template="plotly_white"
         )
-        return ui.HTML(fig.to_html(full_html=False)) 
+        return plotly_html(fig) 
     
     @output
     @render.data_frame
     def key_stats_dt():
-        new_df, color_map, red_teams, blue_teams, all_teams, averages_by_team, averages_by_team_all = get_match_data()
+        scouting_version()
+        metric_stats = get_team_stats().xs(input.key_stats_metric(), axis=1, level=1)
+        metric_stats = metric_stats.sort_values("trimmed_mean", ascending=False).reset_index()
+        return render.DataGrid(metric_stats.round(2), filters=True)
+
+    @output
+    @render.data_frame
+    def pick_list_dt():
+        scouting_version()
+        alliance = [str(OUR_TEAM_NUMBER)] + list(input.pick_list_alliance())
+        ranked = get_pick_list().rank(alliance, unavailable=input.pick_list_unavailable())
+        return render.DataGrid(ranked.round(1), filters=True)
+
+    @output
+    @render.ui
+    def projected_rankings_title():
+        scouting_version()
+        remaining_matches = get_projected_rankings().remaining_matches
+        return ui.h5(f"Projected Rankings ({remaining_matches} qualification matches left to simulate)")
+
+    @output
+    @render.data_frame
+    def projected_rankings_dt():
+        scouting_version()
+        return render.DataGrid(get_projected_rankings().summary.round(2), filters=True)
 
-        return render.DataGrid(averages_by_team_all.round(2), filters=True)
+    @output
+    @render.data_frame
+    def team_ratings_dt():
+        scouting_version()
+        ratings = get_team_ratings().table()
+        columns = ["matches", "total_rating", "total_trend"] + [f"{component}_rating" for component in team_ratings.RATING_COMPONENTS]
+        table = ratings[columns]
+
+        statbotics_teams = get_statbotics_teams_df()
+        if not statbotics_teams.empty:
+            epa = statbotics_teams.set_index(statbotics_teams["team"].astype(str))[list(season_store.STATBOTICS_EPA_COLUMNS)]
+            table = table.join(epa.rename(columns=season_store.STATBOTICS_EPA_COLUMNS))
+
+        return render.DataGrid(table.sort_values("total_rating", ascending=False).round(1).reset_index(), filters=True)
+
+    @output
+    @render.data_frame
+    def key_averages_dt():
+        scouting_version()
+        return render.DataGrid(scouting.team_aggregates["mean"].reset_index().round(2), filters=True)
     
     @output
     @render.ui
     def our_matches_switch_ui():
         if input.match_or_team() == "Match Number":
-            return ui.input_switch("our_matches_switch", "Filter Our Matches", False)
+            scheduled_teams = sorted(team_schedule, key=int)
+            return ui.div(
+                ui.input_switch("our_matches_switch", "Filter Matches By Team", False),
+                ui.input_select(
+                    "filter_team",
+                    "",
+                    choices=scheduled_teams,
+                    selected=str(OUR_TEAM_NUMBER) if str(OUR_TEAM_NUMBER) in team_schedule else None,
+                ),
+            )
         else:
             return None
 
@@ -725,13 +1068,9 @@ def server(input, output, session):
     def match_list_combobox():
         if input.match_or_team() == "Match Number":
             if input.our_matches_switch():
-            # Fix: Use .apply() to check if OUR_TEAM_NUMBER is in the list of team keys
-                matches_df_copy = matches_df[
-                    matches_df["alliances.blue.team_keys"].apply(lambda teams: any(str(OUR_TEAM_NUMBER) in team for team in teams)) |
-                    matches_df["alliances.red.team_keys"].apply(lambda teams: any(str(OUR_TEAM_NUMBER) in team for team in teams))]
-                match_numbers = matches_df_copy["match_number"]
+                match_numbers = team_schedule.get(input.filter_team(), ())
             else:
-                match_numbers = matches_df["match_number"]
+                match_numbers = match_index.keys()
 
             return (
                 ui.input_select(
@@ -744,7 +1083,7 @@ def server(input, output, session):
                 ),
             )
         else: 
-            team_numbers = df_unique_teams["team_key"].astype(str).tolist()
+            team_numbers = get_scouted_teams()
             return ui.div(
                 ui.input_select("red1", "Red Alliance Teams", choices=team_numbers),
                 ui.input_select("red2", "", choices=team_numbers),
@@ -757,7 +1096,7 @@ def server(input, output, session):
     @output
     @render.ui
     def team_list_combobox():
-        team_numbers = df_unique_teams["team_key"].astype(str).tolist()  # Ensure values are strings
+        team_numbers = get_scouted_teams()
 
         return ui.input_select(
             "team_select",  # Assign a unique ID to retrieve the selected value
@@ -769,18 +1108,125 @@ def server(input, output, session):
     @reactive.calc
     def filter_by_team():
         team_number = input.team_select()  # Get selected team from dropdown
-        return df[df["team_key"] == team_number]
+        scouting_version()
+        return scouting.df[scouting.df["team_key"] == team_number]
 
     @output
     @render.data_frame
     def key_stats_by_team_dt():
         return render.DataGrid(filter_by_team().round(2), filters=True)
     
+    @output
+    @render.data_frame
+    def team_schedule_dt():
+        team_number = input.team_select()
+
+        scouting_version()
+        prediction_index = get_prediction_index()
+        schedule_simulation = get_schedule_simulation()
+
+        rows = []
+        for match_number in team_schedule.get(team_number, ()):
+            lineup = match_index[match_number]
+            prediction = prediction_index[match_number]
+            if team_number in lineup.red_teams:
+                alliance, partners, opponents = "red", lineup.red_teams, lineup.blue_teams
+                predicted, opponent_predicted = prediction.red_score, prediction.blue_score
+            else:
+                alliance, partners, opponents = "blue", lineup.blue_teams, lineup.red_teams
+                predicted, opponent_predicted = prediction.blue_score, prediction.red_score
+            rows.append({
+                "Match": match_number,
+                "Alliance": alliance,
+                "Partners": ", ".join(team for team in partners if team != team_number),
+                "Opponents": ", ".join(opponents),
+                "Predicted Score": round(predicted, 1),
+                "Opponent Predicted Score": round(opponent_predicted, 1),
+                "Simulated Win Probability": round(schedule_simulation.loc[match_number, f"{alliance}_win_probability"], 2),
+                "Simulated Expected RP": round(schedule_simulation.loc[match_number, f"{alliance}_expected_rp"], 2),
+            })
+
+        return render.DataGrid(pd.DataFrame(rows))
+
+    @output
+    @render.data_frame
+    def pit_scouting_dt():
+        scouting_version()
+        profiles = get_team_profiles()
+        team_number = int(input.team_select())
+        if team_number not in profiles.index:
+            return None
+
+        profile = profiles.loc[[team_number]].round(1).iloc[0].dropna()
+        return render.DataGrid(pd.DataFrame({"Field": profile.index, "Value": profile.astype(str).to_numpy()}))
+
+    @output
+    @render.data_frame
+    def team_season_dt():
+        summary = season_store.team_event_summary(get_season_store(), int(input.team_select()))
+        return render.DataGrid(summary.round(1).reset_index())
+
+    @output
+    @render.data_frame
+    def prescouting_dt():
+        store = get_season_store()
+
+        # The schedule may not be out yet, but Statbotics knows who is registered
+        event_teams = set(int(team) for team in team_schedule)
+        if CURRENT_EVENT in store.statbotics.index.get_level_values("event_key"):
+            event_teams.update(store.statbotics.xs(CURRENT_EVENT, level="event_key").index)
+        if input.prescouting_unseen_only():
+            scouting_version()
+            event_teams.difference_update(int(team) for team in get_scouted_teams())
+
+        table = season_store.prescouting_table(store, sorted(event_teams), CURRENT_EVENT)
+        return render.DataGrid(table.sort_values("epa", ascending=False).round(1).reset_index(), filters=True)
+
+    @output
+    @render.ui
+    def reconciliation_summary():
+        scouting_version()
+        result = get_reconciliation()
+        return ui.h5(
+            f"{result.alliances['flagged'].sum()} of {len(result.alliances)} alliances and "
+            f"{result.robots['flagged'].sum()} of {len(result.robots)} robots don't match the official results"
+        )
+
+    @output
+    @render.data_frame
+    def flagged_alliances_dt():
+        scouting_version()
+        alliances = get_reconciliation().alliances
+        columns = ["robots_scouted", "flagged_fields"] + [f"{field}_error" for field in reconciliation.RECONCILED_FIELDS]
+        return render.DataGrid(alliances.loc[alliances["flagged"], columns].round(1).reset_index(), filters=True)
+
+    @output
+    @render.data_frame
+    def flagged_robots_dt():
+        scouting_version()
+        robots = get_reconciliation().robots
+        return render.DataGrid(robots[robots["flagged"]].drop(columns="flagged"), filters=True)
+
+    @output
+    @render.data_frame
+    def team_bias_dt():
+        scouting_version()
+        team_bias = get_reconciliation().team_bias
+        return render.DataGrid(team_bias.round(2).rename_axis("team_key").reset_index(), filters=True)
+
+    @output
+    @render.data_frame
+    def opr_comparison_dt():
+        scouting_version()
+        comparison = get_opr_comparison().dropna(subset=["scouted_points", "opr_points"])
+        comparison = comparison.sort_values("points_difference", key=abs, ascending=False)
+        return render.DataGrid(comparison.round(1).reset_index(), filters=True)
+
     @output
     @render.ui
     def team_piece_summary_auto():
         team_data = filter_by_team()
-        return px.bar(
+        fig = px.bar(
             team_data,
             x="match_number",
             y=[
@@ -792,11 +1238,13 @@ def server(input, output, session):
                 "autoAlgaeProc",
             ],
         )
+        return plotly_html(fig)
+
     @output
     @render.ui
     def team_piece_summary_teleop():
         team_data = filter_by_team()
-        return px.bar(
+        fig = px.bar(
             team_data,
             x="match_number",
             y=[
@@ -806,20 +1254,25 @@ def server(input, output, session):
                 "teleopCoralL4",
                 "teleopAlgaeNet",
                 "teleopAlgaeProc"
-        ],
-    )
+            ],
+        )
+        return plotly_html(fig)
+
     # print(df.keys())
     @output
     @render.ui
+    @figure_cache.cached(event_cache_key)
     def statbotics_scatter():
-        new_df, color_map, red_teams, blue_teams, all_teams, averages_by_team, averages_by_team_all = get_match_data()
-        teams = averages_by_team_all["team_key"]
+        alliance_df = get_alliance_selection_df()
+        teams = alliance_df["team_key"]
         
-        x = averages_by_team_all["endgamePlusAuto"]
-        y = averages_by_team_all["totalTeleopPoints"]
+        x = alliance_df["endgamePlusAuto"]
+        y = alliance_df["totalTeleopPoints"]
 
         # Create the plot
-        fig = px.scatter(averages_by_team_all, x="endgamePlusAuto", y="totalTeleopPoints", text=teams, 
+        fig = px.scatter(alliance_df, x="endgamePlusAuto", y="totalTeleopPoints", text=teams, 
+                         error_x="endgamePlusAuto_ci_plus", error_x_minus="endgamePlusAuto_ci_minus",
+                         error_y="totalTeleopPoints_ci_plus", error_y_minus="totalTeleopPoints_ci_minus",
                          title="Auto & Endgame vs Teleop", color="totalPieces", hover_name="team_key", hover_data={
                             "team_key": "",
                             "totalPieces":":.2f", 
@@ -841,20 +1294,23 @@ def server(input, output, session):
                                     symbol='circle', size=10),
                         textposition="middle left")
         
-        return ui.HTML(fig.to_html(full_html=False))
+        return plotly_html(fig)
         
     # print(df.keys())
     @output
     @render.ui
+    @figure_cache.cached(event_cache_key)
     def statbotics_scatter2():
-        new_df, color_map, red_teams, blue_teams, all_teams, averages_by_team, averages_by_team_all = get_match_data()
-        teams = averages_by_team_all["team_key"]
+        alliance_df = get_alliance_selection_df()
+        teams = alliance_df["team_key"]
         
-        x = averages_by_team_all["totalAutoPoints"]
-        y = averages_by_team_all["totalTeleopPoints"]
+        x = alliance_df["totalAutoPoints"]
+        y = alliance_df["totalTeleopPoints"]
 
         # Create the plot
-        fig = px.scatter(averages_by_team_all, x="totalAutoPoints", y="totalTeleopPoints", text=teams, 
+        fig = px.scatter(alliance_df, x="totalAutoPoints", y="totalTeleopPoints", text=teams, 
+                         error_x="totalAutoPoints_ci_plus", error_x_minus="totalAutoPoints_ci_minus",
+                         error_y="totalTeleopPoints_ci_plus", error_y_minus="totalTeleopPoints_ci_minus",
                          title="Auto vs Teleop", color="totalPieces", hover_name="team_key", hover_data={
                             "team_key": "",
                             "totalPieces":":.2f", 
@@ -876,19 +1332,20 @@ def server(input, output, session):
                                     symbol='circle', size=10),
                         textposition="middle left")
         
-        return ui.HTML(fig.to_html(full_html=False))
+        return plotly_html(fig)
     
     @output
     @render.ui
+    @figure_cache.cached(event_cache_key)
     def pieces_scatter():
-        new_df, color_map, red_teams, blue_teams, all_teams, averages_by_team, averages_by_team_all = get_match_data()
-        teams = averages_by_team_all["team_key"]
+        alliance_df = get_alliance_selection_df()
+        teams = alliance_df["team_key"]
         
-        y = averages_by_team_all["algaeTeleop"] + averages_by_team_all["algaeAuto"]
-        x = averages_by_team_all["totalTeleopCoral"] + averages_by_team_all["totalAutoCoral"]
+        y = alliance_df["algaeTeleop"] + alliance_df["algaeAuto"]
+        x = alliance_df["totalTeleopCoral"] + alliance_df["totalAutoCoral"]
 
         # Create the plot
-        fig = px.scatter(averages_by_team_all, x=x, y=y, text=teams, 
+        fig = px.scatter(alliance_df, x=x, y=y, text=teams, 
                          title="Pieces", color="totalPieces", hover_name="team_key", hover_data={
                             "team_key": "",
                             "totalPieces":":.2f", 
@@ -910,16 +1367,16 @@ def server(input, output, session):
                                     symbol='circle', size=10),
                         textposition="middle left")
         
-        return ui.HTML(fig.to_html(full_html=False))
+        return plotly_html(fig)
 
 
     @output
     @render.ui
     def avg_coral_red_box():
         
-        new_df, color_map, red_teams, blue_teams, all_teams, averages_by_team, averages_by_team_all = get_match_data()
-        red_df = averages_by_team.loc[averages_by_team["team_key"].isin(red_teams)]
-        avg_coral_pieces = red_df["totalTeleopCoral"].sum()+red_df["totalAutoCoral"].sum()
+        match = get_match_data()
+        totals = match.alliance_totals["red"]
+        avg_coral_pieces = totals["totalTeleopCoral"] + totals["totalAutoCoral"]
         
         return ui.value_box(
             title="Avg Coral Pieces RED",
@@ -929,10 +1386,9 @@ def server(input, output, session):
     @output
     @render.ui
     def avg_coral_blue_box():
-        new_df, color_map, red_teams, blue_teams, all_teams, averages_by_team, averages_by_team_all = get_match_data()
-        blue_df = averages_by_team.loc[averages_by_team["team_key"].isin(blue_teams)]
-
-        avg_coral_pieces = blue_df["totalTeleopCoral"].sum()+blue_df["totalAutoCoral"].sum()
+        match = get_match_data()
+        totals = match.alliance_totals["blue"]
+        avg_coral_pieces = totals["totalTeleopCoral"] + totals["totalAutoCoral"]
         
         return ui.value_box(
             title="Avg Coral Pieces BLUE",
@@ -942,10 +1398,8 @@ def server(input, output, session):
     @output
     @render.ui
     def avg_endgame_red_box():
-        new_df, color_map, red_teams, blue_teams, all_teams, averages_by_team, averages_by_team_all = get_match_data()
-        red_df = averages_by_team.loc[averages_by_team["team_key"].isin(red_teams)]
-
-        endgame_avg = red_df["endgamePoints"].sum()
+        match = get_match_data()
+        endgame_avg = match.alliance_totals["red"]["endgamePoints"]
         
         return ui.value_box(
             title="Avg Endgame Points RED",
@@ -955,10 +1409,8 @@ def server(input, output, session):
     @output
     @render.ui
     def avg_endgame_blue_box():
-        new_df, color_map, red_teams, blue_teams, all_teams, averages_by_team, averages_by_team_all = get_match_data()
-        blue_df = averages_by_team.loc[averages_by_team["team_key"].isin(blue_teams)]
-
-        endgame_avg = blue_df["endgamePoints"].sum()
+        match = get_match_data()
+        endgame_avg = match.alliance_totals["blue"]["endgamePoints"]
         
         return ui.value_box(
             title="Avg Endgame Points BLUE",
@@ -976,34 +1428,64 @@ def server(input, output, session):
 
     #     return scouted_data, statbotics_data
     
+    @output
+    @render.ui
+    def red_simulation_box():
+        return simulation_box("red")
+
+    @output
+    @render.ui
+    def blue_simulation_box():
+        return simulation_box("blue")
+
+    @output
+    @render.ui
+    @figure_cache.cached(lineup_cache_key)
+    def simulated_scores_histogram():
+        simulation = simulate_selected_match()
+
+        fig = go.Figure()
+        fig.add_trace(go.Histogram(x=simulation.red_scores, name="Red", marker_color=RED_COLOR, opacity=0.6))
+        fig.add_trace(go.Histogram(x=simulation.blue_scores, name="Blue", marker_color=BLUE_COLOR, opacity=0.6))
+        fig.update_layout(
+            barmode="overlay",
+            title=f"Simulated Scores ({len(simulation.red_scores)} matches)",
+            xaxis_title="Score",
+            yaxis_title="Simulated Matches",
+            template="plotly_white",
+        )
+        return plotly_html(fig)
+
     @render.text
     def red_statbotics_prediction():
-        match_num = int(input.match_select())
-        statbotics_data_filtered = statbotics_df.loc[
-            (statbotics_df["match_number"] == match_num )
-            & (statbotics_df["comp_level"] == "qm")
-        ]
+        prediction = get_prediction_index()[int(input.match_select())]
         return ui.value_box(
             title="Prediction RED",
-            value=str(statbotics_data_filtered["pred.red_score"].sum())
+            value=str(prediction.red_score)
         )
 
     @render.text
     def blue_statbotics_prediction():
-        match_num = int(input.match_select())
-        statbotics_data_filtered = statbotics_df.loc[
-            (statbotics_df["match_number"] == match_num) 
-            & (statbotics_df["comp_level"] == "qm")
-        ]
+        prediction = get_prediction_index()[int(input.match_select())]
         return ui.value_box(
             title="Prediction BLUE",
-            value=str(statbotics_data_filtered["pred.blue_score"].sum())
+            value=str(prediction.blue_score)
         )
     
+    @output
+    @render.data_frame
+    def lineup_capabilities_dt():
+        match = get_match_data()
+        lineup = [int(team) for team in match.red_teams + match.blue_teams]
+        capabilities = get_team_profiles().reindex(lineup, columns=LINEUP_CAPABILITY_COLUMNS)
+
+        capabilities.insert(0, "Alliance", ["Red"] * len(match.red_teams) + ["Blue"] * len(match.blue_teams))
+        return render.DataGrid(capabilities.round(1).reset_index())
+
     @output
     @render.data_frame
     def statbotics_dataframe():
-        return render.DataGrid(statbotics_df, filters=True)
+        return render.DataGrid(get_statbotics_df(), filters=True)
     
     
-app = App(app_ui, server)
\ No newline at end of file
+app = App(app_ui, server, static_assets={f"/{PLOTLY_JS_ROUTE}": PLOTLY_JS_FILE})
\ No newline at end of file
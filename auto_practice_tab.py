@@ -19,7 +19,7 @@ def auto_tab_ui():
 def auto_tab_server(input, output, session):
     @render_widget
     def coral_vs_algae_plot():
-        teams = ["frc3504", "frc4467", "frc10101", "frc5045", "frc538", "frc3966"]
+        teams = ["3504", "4467", "10101", "5045", "538", "3966"]
         selected_teams = df[df["team_key"].isin(teams)]
         # Coral scored on reef vs. auto scored
         avg = selected_teams.groupby("team_key").mean(numeric_only=True).reset_index()
@@ -34,7 +34,7 @@ def auto_tab_server(input, output, session):
 
     @render_widget
     def coral_by_level_plot():
-        teams = ["frc3504", "frc4467", "frc10101", "frc5045", "frc538", "frc3966"]
+        teams = ["3504", "4467", "10101", "5045", "538", "3966"]
         selected_teams = df[df["team_key"].isin(teams)]
         avg = selected_teams.groupby("team_key").mean(numeric_only=True).reset_index()
         # Avg Auto Coral by Team
@@ -46,7 +46,7 @@ def auto_tab_server(input, output, session):
 
     @render_widget
     def coral_points_by_level_plot():
-        teams = ["frc3504", "frc4467", "frc10101", "frc5045", "frc538", "frc3966"]
+        teams = ["3504", "4467", "10101", "5045", "538", "3966"]
         selected_teams = df[df["team_key"].isin(teams)]
         avg = selected_teams.groupby("team_key").mean(numeric_only=True).reset_index()
         # Avg Auto Coral Points by Team
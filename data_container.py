@@ -1,8 +1,6 @@
-import pandas as pd
-df = pd.read_csv("data/2025tnkn/match_scouting.csv")
+from pathlib import Path
 
+from utils import scouting_utils
 
-df["autoCoralL4Points"] = df["autoCoralL4"] * 7
-df["autoCoralL3Points"] = df["autoCoralL3"] * 6
-df["autoCoralL2Points"] = df["autoCoralL2"] * 4
-df["autoCoralL1Points"] = df["autoCoralL1"] * 3
\ No newline at end of file
+# The derived columns (i.e. autoCoralL4Points) come from the season's scoring table in utils/derived_metrics.py
+df = scouting_utils.load_match_scouting(Path("data/2025tnkn/match_scouting.csv"))
@@ -1,7 +1,15 @@
+import argparse
+import concurrent.futures
+import json
 import pathlib
+import sys
+import time
+import traceback
 
-from metadata import SCOUT_RADIOZ_ORG, CURRENT_EVENT
+from metadata import SCOUT_RADIOZ_ORGS, CURRENT_EVENT
 
+from utils.event_cache import CACHE_DIRECTORY_NAME, build_event_cache
+from utils.http_utils import DEFAULT_TIMEOUT, MAX_RETRIES, MAX_RETRY_WAIT
 from utils.scout_radioz_utils import (
     download_scout_radioz_match_scouting,
     download_scout_radioz_pit_scouting,
@@ -12,28 +20,178 @@ from utils.statbotics_utils import (
 )
 from utils.tba_utils import download_tba_event_matches
 
+DATA_DIRECTORY = pathlib.Path(__file__).resolve().parent / "data"
 
-def download_external_data(event):
+# How many events a batch scrape downloads at the same time. Each event fetches its sources concurrently as well,
+# and the per-host rate limits in http_utils keep the total load on each API in check.
+DEFAULT_EVENT_WORKERS = 4
+
+
+def download_external_data(event, sequential=False, timeout=DEFAULT_TIMEOUT):
     """
     Downloads the external data (Statbotics, TBA, etc) for a specific event
     :param event: The event key
+    :param sequential: If true, the sources are downloaded one after another instead of all at once
+    :param timeout: Seconds to wait on the server for each request before giving up on it
+    :return: Source name -> "changed", "unchanged" or "failed"
     """
-    script_directory = pathlib.Path(__file__).resolve().parent
-
-    data_directory = script_directory / "data" / event
+    data_directory = DATA_DIRECTORY / event
     data_directory.mkdir(parents=True, exist_ok=True)
 
-    download_statbotics_matches(event, data_directory / "statbotics_matches.json")
-    download_statbotics_event_teams(event, data_directory / "statbotics_teams.json")
-    download_tba_event_matches(event, data_directory / "tba_matches.json")
+    sources = {
+        "Statbotics matches": lambda: download_statbotics_matches(
+            event, data_directory / "statbotics_matches.json", timeout=timeout
+        ),
+        "Statbotics teams": lambda: download_statbotics_event_teams(
+            event, data_directory / "statbotics_teams.json", timeout=timeout
+        ),
+        "TBA matches": lambda: download_tba_event_matches(
+            event, data_directory / "tba_matches.json", timeout=timeout
+        ),
+    }
 
-    download_scout_radioz_match_scouting(
-        SCOUT_RADIOZ_ORG, event, data_directory / "match_scouting.csv"
-    )
-    download_scout_radioz_pit_scouting(
-        SCOUT_RADIOZ_ORG, event, data_directory / "pit_scouting.csv"
-    )
+    # We don't know who scouted events that aren't in the metadata, so leave their scouting data alone
+    org_key = SCOUT_RADIOZ_ORGS.get(event)
+    if org_key is None:
+        print(f"No ScoutRadioz org is known for {event}, skipping the scouting data")
+    else:
+        sources["ScoutRadioz match scouting"] = lambda: download_scout_radioz_match_scouting(
+            org_key, event, data_directory / "match_scouting.csv", timeout=timeout
+        )
+        sources["ScoutRadioz pit scouting"] = lambda: download_scout_radioz_pit_scouting(
+            org_key, event, data_directory / "pit_scouting.csv", timeout=timeout
+        )
+
+    statuses = __run_sources(sources, sequential)
+
+    # Leave the cache alone if nothing changed, so there is nothing to commit
+    if "changed" in statuses.values() or not (data_directory / CACHE_DIRECTORY_NAME).exists():
+        build_event_cache(data_directory)
+    else:
+        print(f"No new data for {event}")
+
+    return statuses
+
+
+def __run_sources(sources, sequential):
+    """
+    Runs the downloaders. A source that fails keeps its previous data, and does not stop the other sources.
+    :param sources: Source name -> downloader function
+    :param sequential: If true, run them one after another instead of concurrently
+    :return: Source name -> "changed", "unchanged" or "failed"
+    """
+
+    def run(name):
+        try:
+            return "changed" if sources[name]() else "unchanged"
+        except Exception:
+            # Printed all at once, so the errors of concurrent sources don't get interleaved
+            print(f"Failed to download {name}:\n{traceback.format_exc()}")
+            return "failed"
+
+    if sequential:
+        return {name: run(name) for name in sources}
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=len(sources)) as executor:
+        futures = {name: executor.submit(run, name) for name in sources}
+        return {name: future.result() for name, future in futures.items()}
+
+
+def season_events(year):
+    """
+    Gets every event of a season that we have scouted or already have data for.
+    :param year: The season, i.e. 2025
+    :return: The sorted event keys
+    """
+    events = {event for event in SCOUT_RADIOZ_ORGS if event.startswith(str(year))}
+    events.update(path.name for path in DATA_DIRECTORY.glob(f"{year}*") if path.is_dir())
+
+    return sorted(events)
+
+
+def download_events(events, max_workers=DEFAULT_EVENT_WORKERS, sequential=False, timeout=DEFAULT_TIMEOUT):
+    """
+    Downloads the external data for multiple events in parallel, printing progress as each event finishes.
+    :param events: The event keys
+    :param max_workers: How many events to download at the same time
+    :param sequential: If true, download one event (and one source) at a time
+    :param timeout: Seconds to wait on the server for each request before giving up on it
+    :return: The summary report. Event key -> {"seconds": ..., "sources": {source name -> status}}, plus the
+        "error" of any event that failed outside of its sources (i.e. building its cache)
+    """
+    report = {}
+
+    def run(event):
+        start = time.monotonic()
+        try:
+            event_report = {"sources": download_external_data(event, sequential=sequential, timeout=timeout)}
+        except Exception as error:
+            print(f"Failed to download {event}:\n{traceback.format_exc()}")
+            event_report = {"sources": {}, "error": f"{type(error).__name__}: {error}"}
+        return {"seconds": round(time.monotonic() - start, 2), **event_report}
+
+    workers = 1 if sequential else max_workers
+    with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = {executor.submit(run, event): event for event in events}
+        for i, future in enumerate(concurrent.futures.as_completed(futures)):
+            event = futures[future]
+            report[event] = future.result()
+            print(f"[{i + 1}/{len(events)}] {event}: {__summarize(report[event])}")
+
+    report = {event: report[event] for event in events}
+
+    print("Summary:")
+    for event, event_report in report.items():
+        print(f"  {event:<12} {__summarize(event_report)}")
+
+    return report
+
+
+def __summarize(event_report):
+    if "error" in event_report:
+        return f"failed, {event_report['error']} ({event_report['seconds']}s)"
+
+    statuses = list(event_report["sources"].values())
+    counts = ", ".join(f"{statuses.count(status)} {status}" for status in ["changed", "unchanged", "failed"])
+    return f"{counts} ({event_report['seconds']}s)"
 
 
 if __name__ == "__main__":
-    download_external_data(CURRENT_EVENT)
+    parser = argparse.ArgumentParser(description="Downloads the scouting and external data for one or more events")
+    parser.add_argument("--events", nargs="+", help="The events to download. Defaults to the current event")
+    parser.add_argument("--season", type=int, help="Download every event of the season we have data for")
+    parser.add_argument("--workers", type=int, default=DEFAULT_EVENT_WORKERS, help="Events to download at once")
+    parser.add_argument("--report", type=pathlib.Path, help="Also save the batch summary report to this json file")
+    parser.add_argument("--sequential", action="store_true", help="Download the sources one at a time")
+    parser.add_argument(
+        "--timeout",
+        type=float,
+        default=DEFAULT_TIMEOUT,
+        help=f"Seconds to wait on the server for each request. Failed requests are retried {MAX_RETRIES} times, "
+        f"waiting at most {MAX_RETRY_WAIT}s in between",
+    )
+    args = parser.parse_args()
+
+    if args.events or args.season:
+        events = list(args.events or []) + (season_events(args.season) if args.season else [])
+        events = list(dict.fromkeys(events))
+
+        report = download_events(events, max_workers=args.workers, sequential=args.sequential, timeout=args.timeout)
+        if args.report:
+            with open(args.report, "w") as f:
+                json.dump(report, f, indent=4)
+    else:
+        statuses = download_external_data(CURRENT_EVENT, sequential=args.sequential, timeout=args.timeout)
+        report = {CURRENT_EVENT: {"sources": statuses}}
+
+    # The sources that did download are kept, but the scrape workflow must not commit a partial update as a success
+    failed = [event for event, event_report in report.items() if "error" in event_report]
+    failed += [
+        f"{event} {source}"
+        for event, event_report in report.items()
+        for source, status in event_report["sources"].items()
+        if status == "failed"
+    ]
+    if failed:
+        print(f"Failed to download: {', '.join(failed)}")
+        sys.exit(1)
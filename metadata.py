@@ -2,23 +2,41 @@
 # OUR_TEAM_NUMBER = 4467
 # SCOUT_RADIOZ_ORG = "frc4467"
 # CURRENT_EVENT = "2025nysu"
+# CURRENT_EVENT_TYPE = "regional"
 
 # Week 4
 # OUR_TEAM_NUMBER = 3504
 # SCOUT_RADIOZ_ORG = "steelcity"
 # CURRENT_EVENT = "2025paca"
+# CURRENT_EVENT_TYPE = "regional"
 
 # Week 6 - Buckeye
 # OUR_TEAM_NUMBER = 3260
 # SCOUT_RADIOZ_ORG = "steelcity"
 # CURRENT_EVENT = "2025ohcl"
+# CURRENT_EVENT_TYPE = "regional"
 
 # # Week 6 - SMR
 # OUR_TEAM_NUMBER = 3504
 # SCOUT_RADIOZ_ORG = "frc4467"
 # CURRENT_EVENT = "2025tnkn"
+# CURRENT_EVENT_TYPE = "regional"
 
 # Champs
 OUR_TEAM_NUMBER = 4467
 SCOUT_RADIOZ_ORG = "steelcity"
 CURRENT_EVENT = "2025mil"
+CURRENT_EVENT_TYPE = "championship"
+
+# The ScoutRadioz org that scouted each event, so old events can be re-downloaded in a batch
+SCOUT_RADIOZ_ORGS = {
+    "2025nysu": "frc4467",
+    "2025paca": "steelcity",
+    "2025ohcl": "steelcity",
+    "2025tnkn": "frc4467",
+    CURRENT_EVENT: SCOUT_RADIOZ_ORG,
+}
+
+# Every event with data in the data directory. The season store combines all of them, so teams can be pre-scouted
+# from the events we saw them at before
+SEASON_EVENTS = ["2025txwac", "2025nysu", "2025paca", "2025ohcl", "2025tnkn", "2025miber", "2025mil"]
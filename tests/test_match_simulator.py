@@ -0,0 +1,42 @@
+import numpy as np
+
+from utils import match_simulator
+from utils.match_context import MatchLineup
+
+
+def make_samples(team_values):
+    """
+    :param team_values: Team key -> the SAMPLED_COLUMNS values of each of its scouted matches
+    """
+    team_index, offsets, counts, values = {}, [], [], []
+    for team, matches in team_values.items():
+        team_index[team] = len(offsets)
+        offsets.append(len(values))
+        counts.append(len(matches))
+        values.extend(matches)
+
+    return match_simulator.ScoutingSamples(
+        team_index=team_index,
+        offsets=np.array(offsets, dtype=np.intp),
+        counts=np.array(counts, dtype=np.intp),
+        values=np.array(values, dtype=float).reshape(-1, len(match_simulator.SAMPLED_COLUMNS)),
+    )
+
+
+def test_empty_schedule_has_no_matches():
+    summary = match_simulator.simulate_schedule(make_samples({}), {}, seed=0)
+
+    assert summary.empty
+    assert summary.index.name == "match_number"
+
+
+def test_empty_schedule_has_the_same_columns():
+    row = [30, 10, 20, 2, 1, 1, 1, 1, 1, 1]
+    samples = make_samples({team: [row] for team in ["1", "2", "3", "4", "5", "6"]})
+    match_index = {1: MatchLineup(red_teams=("1", "2", "3"), blue_teams=("4", "5", "6"))}
+
+    summary = match_simulator.simulate_schedule(samples, match_index, sample_count=10, seed=0)
+    empty = match_simulator.simulate_schedule(samples, {}, sample_count=10, seed=0)
+
+    assert list(empty.columns) == list(summary.columns)
+    assert summary.loc[1, "tie_probability"] == 1
@@ -0,0 +1,98 @@
+import json
+
+import pytest
+
+from utils import http_utils, tba_utils
+
+
+class StubResponse:
+    def __init__(self, status_code, payload=None, headers=None):
+        self.status_code = status_code
+        self.payload = payload
+        self.headers = headers or {}
+
+    def raise_for_status(self):
+        pass
+
+    def json(self):
+        return self.payload
+
+
+class StubSession:
+    """
+    Stands in for the shared requests session, handing out the queued responses and remembering the request headers
+    """
+
+    def __init__(self, *responses):
+        self.responses = list(responses)
+        self.request_headers = []
+
+    def get(self, url, timeout=None, headers=None, **kwargs):
+        self.request_headers.append(headers or {})
+        return self.responses.pop(0)
+
+
+MATCHES = [{"key": "2025paca_qm1", "comp_level": "qm", "match_number": 1}]
+
+
+@pytest.fixture
+def stub_session(monkeypatch):
+    monkeypatch.setenv("TBA_API_KEY", "test")
+    monkeypatch.setattr(http_utils, "throttle", lambda url: None)
+
+    def install(*responses):
+        session = StubSession(*responses)
+        monkeypatch.setattr(http_utils, "get_session", lambda: session)
+        return session
+
+    return install
+
+
+def read_state(output_file):
+    with open(output_file.parent / http_utils.DOWNLOAD_STATE_FILENAME, "rb") as f:
+        return f.read()
+
+
+def test_first_download_saves_the_validators(tmp_path, stub_session):
+    output_file = tmp_path / "tba_matches.json"
+    stub_session(StubResponse(200, MATCHES, {"ETag": '"a"'}))
+
+    assert tba_utils.download_tba_event_matches("2025paca", output_file)
+    assert json.loads(read_state(output_file)) == {"tba_matches.json": {"etag": '"a"'}}
+
+
+def test_not_modified_leaves_the_files_alone(tmp_path, stub_session):
+    output_file = tmp_path / "tba_matches.json"
+    stub_session(StubResponse(200, MATCHES, {"ETag": '"a"'}))
+    tba_utils.download_tba_event_matches("2025paca", output_file)
+    data, state = output_file.read_bytes(), read_state(output_file)
+
+    session = stub_session(StubResponse(304))
+
+    assert not tba_utils.download_tba_event_matches("2025paca", output_file)
+    assert session.request_headers[0]["If-None-Match"] == '"a"'
+    assert output_file.read_bytes() == data
+    assert read_state(output_file) == state
+
+
+def test_new_validators_for_the_same_data_are_not_saved(tmp_path, stub_session):
+    output_file = tmp_path / "tba_matches.json"
+    stub_session(StubResponse(200, MATCHES, {"ETag": '"a"'}))
+    tba_utils.download_tba_event_matches("2025paca", output_file)
+    state = read_state(output_file)
+
+    stub_session(StubResponse(200, MATCHES, {"ETag": '"b"', "Last-Modified": "Sat, 01 Mar 2025 12:00:00 GMT"}))
+
+    assert not tba_utils.download_tba_event_matches("2025paca", output_file)
+    assert read_state(output_file) == state
+
+
+def test_changed_data_saves_the_new_validators(tmp_path, stub_session):
+    output_file = tmp_path / "tba_matches.json"
+    stub_session(StubResponse(200, MATCHES, {"ETag": '"a"'}))
+    tba_utils.download_tba_event_matches("2025paca", output_file)
+
+    stub_session(StubResponse(200, MATCHES + [{"key": "2025paca_qm2"}], {"ETag": '"b"'}))
+
+    assert tba_utils.download_tba_event_matches("2025paca", output_file)
+    assert json.loads(read_state(output_file)) == {"tba_matches.json": {"etag": '"b"'}}
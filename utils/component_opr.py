@@ -0,0 +1,163 @@
+from typing import Dict, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from utils import scouting_utils
+from utils.derived_metrics import scoring_table_for
+from utils.reconciliation import RECONCILED_FIELDS
+from utils.tba_utils import event_match_teams
+
+
+# component -> (score breakdown fields that add up to it, fields that are subtracted). Every field that is both
+# scouted and in the breakdown is a component, so the OPRs are in the same units as the scouting data
+OPR_COMPONENTS: Dict[str, Tuple[Sequence[str], Sequence[str]]] = {
+    **{name: (field.official, field.official_minus) for name, field in RECONCILED_FIELDS.items()},
+    "autoLeavePoints": (["autoMobilityPoints"], []),
+    "totalPoints": (["totalPoints"], ["foulPoints"]),
+}
+
+# component -> the scouting column its OPR stands in for. Auto algae isn't broken out by TBA, so it all counts as teleop
+OPR_SCOUTING_COLUMNS = {
+    **{f"autoCoralL{level}": f"autoCoralL{level}" for level in range(1, 5)},
+    **{f"teleopCoralL{level}": f"teleopCoralL{level}" for level in range(1, 5)},
+    "netAlgae": "teleopAlgaeNet",
+    "processorAlgae": "teleopAlgaeProc",
+}
+
+# Leaving the starting zone is worth this much in auto
+AUTO_LEAVE_POINTS = 3
+
+# Keeps the solve well defined early in an event, when some teams have only played with the same partners. Small
+# enough to not move the OPR of a team that has played a few matches
+OPR_RIDGE = 1e-3
+
+
+def compute_component_opr(matches_df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Computes the offensive power rating of every team for every OPR_COMPONENTS, from the TBA results alone. The OPR
+    is the least squares solution of "the alliance's result is the sum of its robots' contributions" over every
+    played alliance.
+
+    The alliance membership matrix is sparse (three robots per alliance), so the normal equations are built and
+    factored as sparse matrices, and every component is solved with the same factorization.
+
+    :param matches_df: The TBA qualification matches, as returned by tba_utils.load_event_matches. Matches from
+        several events can be concatenated to rate a whole season
+    :return: A data frame indexed by team_key (i.e. "4467") with one column per OPR_COMPONENTS, and the number of
+        played matches the ratings are based on
+    """
+    from scipy import sparse
+    from scipy.sparse.linalg import splu
+
+    empty = pd.DataFrame(columns=list(OPR_COMPONENTS) + ["matches"], index=pd.Index([], name="team_key"))
+    if matches_df.empty:
+        # The schedule hasn't been released yet
+        return empty
+
+    teams = event_match_teams(matches_df)
+    results = __alliance_results(matches_df)
+
+    # Only the alliances that have been played
+    alliance_index = pd.MultiIndex.from_frame(teams[["match_number", "alliance"]])
+    alliance_rows = results.index.get_indexer(alliance_index)
+    teams = teams[alliance_rows >= 0]
+    alliance_rows = alliance_rows[alliance_rows >= 0]
+
+    team_codes, team_keys = pd.factorize(teams["team_key"], sort=True)
+    if len(team_keys) == 0:
+        return empty
+
+    membership = sparse.csr_matrix(
+        (np.ones(len(team_codes)), (alliance_rows, team_codes)), shape=(len(results), len(team_keys))
+    )
+
+    normal = (membership.T @ membership + OPR_RIDGE * sparse.identity(len(team_keys))).tocsc()
+    opr = splu(normal).solve(np.asarray(membership.T @ results.fillna(0).to_numpy(dtype=float)))
+
+    table = pd.DataFrame(opr, index=pd.Index(team_keys, name="team_key"), columns=results.columns)
+    table["matches"] = np.bincount(team_codes, minlength=len(team_keys))
+
+    return table
+
+
+def __alliance_results(matches_df: pd.DataFrame) -> pd.DataFrame:
+    """
+    :return: (match_number, alliance) x OPR_COMPONENTS official results of every played alliance
+    """
+    per_alliance = []
+    for alliance in ["red", "blue"]:
+        breakdown = matches_df.set_index("match_number").filter(like=f"score_breakdown.{alliance}.")
+        breakdown.columns = breakdown.columns.str.removeprefix(f"score_breakdown.{alliance}.")
+
+        results = pd.DataFrame({
+            component: breakdown[list(official)].sum(axis=1, min_count=1) - breakdown[list(minus)].sum(axis=1)
+            for component, (official, minus) in OPR_COMPONENTS.items()
+        })
+        results["alliance"] = alliance
+        per_alliance.append(results.set_index("alliance", append=True))
+
+    return pd.concat(per_alliance).dropna(how="all").sort_index()
+
+
+def opr_scouting_rows(opr: pd.DataFrame, teams: Sequence[str], template: pd.DataFrame) -> pd.DataFrame:
+    """
+    Makes a stand in scouting row for each team, out of their component OPR. Used for teams that haven't been
+    scouted, so they count as an average match of theirs instead of as a robot that did nothing.
+
+    :param opr: The component OPRs, as returned by compute_component_opr
+    :param teams: The team keys to make rows for
+    :param template: The scouting data, for its columns and scoring table
+    :return: One row per team, with the same columns as the scouting data. Teams TBA doesn't know about are zeros
+    """
+    teams = list(teams)
+    rows = pd.DataFrame(0, index=range(len(teams)), columns=template.columns)
+    rows["team_key"] = teams
+    if "year" in template.columns and not template.empty:
+        rows["year"] = template["year"].iloc[0]
+
+    team_opr = opr.reindex(teams).fillna(0).clip(lower=0)
+    for component, column in OPR_SCOUTING_COLUMNS.items():
+        if column in rows.columns:
+            rows[column] = team_opr[component].to_numpy()
+
+    # Scouted as yes / no, so a team that leaves in most of its matches counts as leaving. The auto RP needs every
+    # robot to have left, which a fraction of a leave never is
+    if "didLeaveStartingZone" in rows.columns:
+        rows["didLeaveStartingZone"] = (team_opr["autoLeavePoints"] >= AUTO_LEAVE_POINTS / 2).astype(int).to_numpy()
+
+    # The barge status whose points are closest to the team's barge OPR
+    _, status_points = scoring_table_for(template).status_points["bargeStatus"]
+    statuses = {"Not Parked": 0, **status_points}
+    names, points = list(statuses), np.array(list(statuses.values()))
+    closest = np.abs(team_opr["endgamePoints"].to_numpy()[:, np.newaxis] - points).argmin(axis=1)
+    rows["bargeStatus"] = [names[i] for i in closest]
+
+    return scouting_utils.add_derived_columns(rows, scoring_table_for(template))
+
+
+def compare_with_scouting(opr: pd.DataFrame, team_aggregates: pd.DataFrame) -> pd.DataFrame:
+    """
+    A sanity check of the scouting data. Teams whose scouted averages are far from their OPR are worth a second look.
+
+    :param opr: The component OPRs, as returned by compute_component_opr
+    :param team_aggregates: The aggregates, as returned by scouting_utils.aggregate_by_team
+    :return: A data frame indexed by team_key, with the scouted average and the OPR of the total points, and the
+        difference (scouted - OPR) of every component. The scouted points don't include leaving the starting zone, so
+        neither do the OPR points
+    """
+    averages = team_aggregates["mean"]
+
+    comparison = pd.DataFrame({
+        "matches_scouted": team_aggregates["count"].max(axis=1),
+        "scouted_points": averages["totalPointsScored"],
+        "opr_points": opr["totalPoints"] - opr["autoLeavePoints"],
+    })
+    comparison["points_difference"] = comparison["scouted_points"] - comparison["opr_points"]
+
+    for component, field in RECONCILED_FIELDS.items():
+        scouted = sum(averages[column] for column in field.scouted)
+        comparison[f"{component}_difference"] = scouted - opr[component]
+
+    comparison.index.name = "team_key"
+    return comparison
@@ -0,0 +1,101 @@
+from typing import Dict, List, NamedTuple, Tuple
+
+import numpy as np
+import pandas as pd
+
+
+class ScoringTable(NamedTuple):
+    """
+    Describes how a season's scouted actions turn into points, and which totals the report builds out of them.
+    Adding a metric is a matter of adding a line to the season's table.
+    """
+
+    # raw count column -> points per game piece. Each one adds a "<column>Points" column
+    piece_points: Dict[str, float]
+
+    # categorical column -> (derived column, value -> points). Values that aren't listed are worth nothing
+    status_points: Dict[str, Tuple[str, Dict[str, float]]]
+
+    # derived column -> the columns it is the sum of. These are computed in order, so a total can use the ones
+    # before it. Existing columns with the same name are replaced
+    totals: Dict[str, List[str]]
+
+
+REEFSCAPE_2025 = ScoringTable(
+    piece_points={
+        "autoCoralL1": 3,
+        "autoCoralL2": 4,
+        "autoCoralL3": 6,
+        "autoCoralL4": 7,
+        "autoAlgaeNet": 4,
+        "autoAlgaeProc": 6,
+        "teleopCoralL1": 2,
+        "teleopCoralL2": 3,
+        "teleopCoralL3": 4,
+        "teleopCoralL4": 5,
+        "teleopAlgaeNet": 4,
+        "teleopAlgaeProc": 6,
+    },
+    status_points={
+        "bargeStatus": ("endgamePoints", {"Parked": 2, "Shallow Cage": 6, "Deep Cage": 12}),
+    },
+    totals={
+        "totalTeleopCoral": ["teleopCoralL1", "teleopCoralL2", "teleopCoralL3", "teleopCoralL4"],
+        "totalAutoCoral": ["autoCoralL1", "autoCoralL2", "autoCoralL3", "autoCoralL4"],
+        "totalTeleopCoralPoints": ["teleopCoralL1Points", "teleopCoralL2Points", "teleopCoralL3Points", "teleopCoralL4Points"],
+        "totalTeleopAlgaePoints": ["teleopAlgaeNetPoints", "teleopAlgaeProcPoints"],
+        "totalTeleopPoints": ["totalTeleopCoralPoints", "totalTeleopAlgaePoints"],
+        "totalAutoCoralPoints": ["autoCoralL1Points", "autoCoralL2Points", "autoCoralL3Points", "autoCoralL4Points"],
+        "totalAutoAlgaePoints": ["autoAlgaeNetPoints", "autoAlgaeProcPoints"],
+        "totalAutoPoints": ["totalAutoCoralPoints", "totalAutoAlgaePoints"],
+        "algaeTeleop": ["teleopAlgaeNet", "teleopAlgaeProc"],
+        "algaeAuto": ["autoAlgaeNet", "autoAlgaeProc"],
+        "totalPieces": ["totalTeleopCoral", "totalAutoCoral", "algaeTeleop", "algaeAuto"],
+        "endgamePlusAuto": ["totalAutoPoints", "totalEndgamePoints"],
+        "totalPointsScored": ["totalTeleopPoints", "totalAutoPoints", "endgamePoints"],
+    },
+)
+
+# season -> scoring table
+SCORING_TABLES = {
+    2025: REEFSCAPE_2025,
+}
+
+
+def scoring_table_for(df: pd.DataFrame) -> ScoringTable:
+    """
+    Picks the scoring table for scouting data, based on its year column.
+
+    :param df: The raw scouting data
+    :return: The scoring table. Data without a year uses the latest season
+    """
+    if "year" in df.columns and not df.empty:
+        return SCORING_TABLES[int(df["year"].iloc[0])]
+
+    return SCORING_TABLES[max(SCORING_TABLES)]
+
+
+def compute_derived_columns(df: pd.DataFrame, scoring_table: ScoringTable) -> pd.DataFrame:
+    """
+    Computes every derived column of a scoring table in one pass over the whole data frame.
+
+    :param df: The raw scouting data
+    :param scoring_table: How the season is scored
+    :return: A data frame with only the derived columns, on the same index as df
+    """
+    counts = df[list(scoring_table.piece_points)]
+    piece_points = counts.mul(pd.Series(scoring_table.piece_points)).add_suffix("Points")
+
+    derived = dict(piece_points.items())
+
+    for column, (derived_column, value_points) in scoring_table.status_points.items():
+        status = df[column].to_numpy()
+        derived[derived_column] = pd.Series(
+            np.select([status == value for value in value_points], list(value_points.values()), 0), index=df.index
+        )
+
+    for derived_column, columns in scoring_table.totals.items():
+        parts = [derived[column] if column in derived else df[column] for column in columns]
+        derived[derived_column] = sum(parts[1:], parts[0])
+
+    return pd.DataFrame(derived, index=df.index)
@@ -0,0 +1,182 @@
+import hashlib
+import io
+import json
+from pathlib import Path
+from typing import Callable, Dict, Optional, TextIO, Tuple
+
+import pandas as pd
+
+from utils import scouting_utils, statbotics_utils, tba_utils
+
+
+# Parsing the raw json/csv (and pd.json_normalize in particular) dominates startup, especially in pyodide. The
+# data frames the report builds out of them are saved next to the raw data in a typed, columnar format, so that
+# the app can load them directly.
+CACHE_DIRECTORY_NAME = "cache"
+MANIFEST_FILENAME = "manifest.json"
+
+# Bump this whenever the parsers change the data frames they produce (i.e. new derived columns), so caches built by
+# older code are rebuilt rather than used
+CACHE_FORMAT_VERSION = 8
+
+
+def __parse_match_scouting(f: TextIO) -> pd.DataFrame:
+    return scouting_utils.process_match_scouting(pd.read_csv(f))
+
+
+def __parse_pit_scouting(f: TextIO) -> pd.DataFrame:
+    # Events where pit scouting didn't happen have an empty export
+    try:
+        return scouting_utils.process_pit_scouting(pd.read_csv(f))
+    except pd.errors.EmptyDataError:
+        return pd.DataFrame()
+
+
+def __parse_tba_matches(f: TextIO) -> pd.DataFrame:
+    return tba_utils.stream_event_matches(f)
+
+
+def __parse_statbotics_matches(f: TextIO) -> pd.DataFrame:
+    return statbotics_utils.statbotics_matches_json_to_dataframe(json.load(f))
+
+
+def __parse_statbotics_teams(f: TextIO) -> pd.DataFrame:
+    return statbotics_utils.statbotics_teams_json_to_dataframe(json.load(f))
+
+
+# cache name -> (raw source file, parser for the raw source)
+CACHED_FRAMES: Dict[str, Tuple[str, Callable[[TextIO], pd.DataFrame]]] = {
+    "match_scouting": ("match_scouting.csv", __parse_match_scouting),
+    "pit_scouting": ("pit_scouting.csv", __parse_pit_scouting),
+    "tba_matches": ("tba_matches.json", __parse_tba_matches),
+    "statbotics_matches": ("statbotics_matches.json", __parse_statbotics_matches),
+    "statbotics_teams": ("statbotics_teams.json", __parse_statbotics_teams),
+}
+
+
+def __hash_file(filename: Path) -> str:
+    with open(filename, "rb") as f:
+        return hashlib.sha1(f.read()).hexdigest()
+
+
+def __cache_file(name: str) -> str:
+    return f"{CACHE_DIRECTORY_NAME}/{name}.parquet"
+
+
+############################################
+# Building
+############################################
+def build_event_cache(data_directory: Path):
+    """
+    Parses the raw data for an event and saves the resulting data frames as parquet files in the cache directory.
+    :param data_directory: The event data directory, i.e. data/2025mil
+    """
+    cache_directory = data_directory / CACHE_DIRECTORY_NAME
+    cache_directory.mkdir(parents=True, exist_ok=True)
+
+    manifest = {"format_version": CACHE_FORMAT_VERSION}
+    for name, (source_filename, parser) in CACHED_FRAMES.items():
+        source_file = data_directory / source_filename
+        if not source_file.exists():
+            print(f"Skipping cache for {source_file}, it does not exist")
+            continue
+
+        with open(source_file, "r") as f:
+            df = parser(f)
+
+        df.to_parquet(data_directory / __cache_file(name), index=False)
+        manifest[name] = __hash_file(source_file)
+
+    with open(cache_directory / MANIFEST_FILENAME, "w") as f:
+        json.dump(manifest, f, indent=4)
+
+
+############################################
+# Loading
+############################################
+def load_event_frame(data_directory: Path, name: str) -> pd.DataFrame:
+    """
+    Loads one of the event data frames from disk. The cached parquet file is used if it was built from the current
+    version of the raw data, otherwise the raw data is parsed.
+
+    :param data_directory: The event data directory, i.e. data/2025mil
+    :param name: The name of the data frame, one of CACHED_FRAMES
+    :return: The data frame
+    """
+    source_filename, parser = CACHED_FRAMES[name]
+    source_file = data_directory / source_filename
+
+    cached = __read_local_cache(data_directory, name, source_file)
+    if cached is not None:
+        return cached
+
+    if not source_file.exists():
+        print(f"{source_file} does not exist!")
+        return pd.DataFrame()
+
+    with open(source_file, "r") as f:
+        return parser(f)
+
+
+def __read_local_cache(data_directory: Path, name: str, source_file: Path) -> Optional[pd.DataFrame]:
+    manifest_file = data_directory / CACHE_DIRECTORY_NAME / MANIFEST_FILENAME
+    cache_file = data_directory / __cache_file(name)
+    if not manifest_file.exists() or not cache_file.exists():
+        return None
+
+    with open(manifest_file, "r") as f:
+        manifest = json.load(f)
+
+    if manifest.get("format_version") != CACHE_FORMAT_VERSION:
+        return None
+
+    # The raw data has been re-downloaded since the cache was built
+    if source_file.exists() and manifest.get(name) != __hash_file(source_file):
+        return None
+
+    try:
+        return pd.read_parquet(cache_file)
+    except ImportError:
+        return None
+
+
+def load_remote_event_frame(base_url: str, name: str) -> pd.DataFrame:
+    """
+    Loads one of the event data frames from the published data. Used by the shinylive (pyodide) version of the app.
+    The cached parquet file is used if it can be fetched, otherwise the raw data is downloaded and parsed.
+
+    :param base_url: The url of the event data directory
+    :param name: The name of the data frame, one of CACHED_FRAMES
+    :return: The data frame
+    """
+    from pyodide.http import open_url
+
+    source_filename, parser = CACHED_FRAMES[name]
+
+    try:
+        manifest = json.load(open_url(f"{base_url}/{CACHE_DIRECTORY_NAME}/{MANIFEST_FILENAME}"))
+        if manifest.get("format_version") != CACHE_FORMAT_VERSION:
+            raise ValueError(f"the cache format is {manifest.get('format_version')}, not {CACHE_FORMAT_VERSION}")
+
+        content = __open_url_bytes(f"{base_url}/{__cache_file(name)}")
+        return pd.read_parquet(io.BytesIO(content))
+    except Exception as e:
+        print(f"Could not load cached {name}, falling back to {source_filename}: {e}")
+
+    return parser(open_url(f"{base_url}/{source_filename}"))
+
+
+def __open_url_bytes(url: str) -> bytes:
+    # pyodide.http.open_url only supports text. Synchronous binary requests are allowed inside of a web worker,
+    # which is where shinylive runs the app.
+    from js import XMLHttpRequest
+
+    request = XMLHttpRequest.new()
+    request.open("GET", url, False)
+    request.responseType = "arraybuffer"
+    request.send(None)
+
+    if request.status != 200:
+        raise OSError(f"Request for {url} failed with status {request.status}")
+
+    return request.response.to_py().tobytes()
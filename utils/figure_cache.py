@@ -0,0 +1,84 @@
+import collections
+import functools
+import hashlib
+from typing import Any, Callable, Hashable, Tuple
+
+import pandas as pd
+
+
+def data_version(*dfs: pd.DataFrame) -> str:
+    """
+    Hashes the contents of the given data frames, so that anything cached from them can be thrown away when the
+    data changes.
+
+    :param dfs: The data frames the cached values are built from
+    :return: A short hex digest
+    """
+    digest = hashlib.sha1()
+    for df in dfs:
+        digest.update(pd.util.hash_pandas_object(df, index=True).to_numpy().tobytes())
+        digest.update(",".join(map(str, df.columns)).encode())
+
+    return digest.hexdigest()[:16]
+
+
+class FigureCache:
+    """
+    A least-recently-used cache for rendered figures. Building and serializing a plotly figure is by far the most
+    expensive part of a render, and scouts tend to flip back and forth between the same handful of matches.
+    """
+
+    def __init__(self, max_size: int = 128):
+        """
+        :param max_size: The maximum number of rendered figures to hold on to. Zero disables the cache
+        """
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self.__entries = collections.OrderedDict()
+
+    def __len__(self):
+        return len(self.__entries)
+
+    def get_or_render(self, key: Hashable, render_fn: Callable[[], Any]) -> Any:
+        """
+        Returns the cached figure for the key, rendering and caching it if it does not exist yet.
+
+        :param key: The cache key. It must contain everything the figure depends on
+        :param render_fn: Builds the figure if it is not in the cache
+        :return: The rendered figure
+        """
+        if key in self.__entries:
+            self.hits += 1
+            self.__entries.move_to_end(key)
+            return self.__entries[key]
+
+        self.misses += 1
+        value = render_fn()
+
+        if self.max_size > 0:
+            self.__entries[key] = value
+            while len(self.__entries) > self.max_size:
+                self.__entries.popitem(last=False)
+
+        return value
+
+    def cached(self, key_fn: Callable[[], Tuple]):
+        """
+        Decorator that caches the result of a renderer function, keyed by the renderer name plus key_fn().
+
+        :param key_fn: Returns the rest of the key, i.e. the alliance lineup and the data version
+        """
+
+        def decorator(fn):
+            @functools.wraps(fn)
+            def wrapper():
+                key = (fn.__name__,) + tuple(key_fn())
+                return self.get_or_render(key, fn)
+
+            return wrapper
+
+        return decorator
+
+    def clear(self):
+        self.__entries.clear()
@@ -0,0 +1,205 @@
+import json
+import threading
+import time
+from pathlib import Path
+from typing import Dict
+from urllib.parse import urlparse
+
+# Seconds to wait for a connection, and then for the server to respond, before giving up on a request
+CONNECT_TIMEOUT = 5
+READ_TIMEOUT = 30
+DEFAULT_TIMEOUT = (CONNECT_TIMEOUT, READ_TIMEOUT)
+
+# Venue wifi drops out all the time. Failed connections, rate limiting (429) and server errors (5xx) are retried
+# with exponential backoff: BACKOFF_FACTOR * 2 ^ (retry - 1) seconds, or whatever the server's Retry-After says.
+# Neither waits longer than MAX_RETRY_WAIT, so a server asking for an hour can't stall the scrape.
+MAX_RETRIES = 5
+BACKOFF_FACTOR = 0.5
+MAX_RETRY_WAIT = 30
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+# Enough connections for every source to be fetched at the same time
+POOL_SIZE = 10
+
+# Minimum seconds between the start of two requests to the same host. Keeps a batch scrape of many events from
+# hammering the APIs. Hosts that aren't listed are not limited.
+HOST_MIN_INTERVALS = {
+    "www.thebluealliance.com": 0.1,
+    "api.statbotics.io": 0.25,
+    "scoutradioz.com": 0.5,
+}
+
+# Remembers the ETag / Last-Modified of everything that has been downloaded for an event, so the next scrape can
+# ask the server to only send data that changed. Lives next to the downloaded files.
+DOWNLOAD_STATE_FILENAME = "download_state.json"
+
+
+__session = None
+__session_lock = threading.Lock()
+
+
+def get_session() -> "requests.Session":
+    """
+    Gets the session shared by all of the downloaders. Reusing it keeps connections alive between requests to the
+    same host, and it is safe to share between the threads of a concurrent scrape. Transient errors are retried
+    according to MAX_RETRIES / BACKOFF_FACTOR / MAX_RETRY_WAIT.
+
+    :return: The shared session
+    """
+    # Imported lazily, the app itself (which runs in pyodide) never downloads anything
+    import requests
+    from requests.adapters import HTTPAdapter
+    from urllib3.util.retry import Retry
+
+    global __session
+
+    class CappedRetry(Retry):
+        def get_retry_after(self, response):
+            retry_after = super().get_retry_after(response)
+            return None if retry_after is None else min(retry_after, MAX_RETRY_WAIT)
+
+    with __session_lock:
+        if __session is None:
+            session = requests.Session()
+            retry = CappedRetry(
+                total=MAX_RETRIES,
+                backoff_factor=BACKOFF_FACTOR,
+                backoff_max=MAX_RETRY_WAIT,
+                status_forcelist=RETRY_STATUSES,
+                allowed_methods=["GET"],
+                respect_retry_after_header=True,
+                # Hand the last response back instead of raising, the callers decide what a failure means
+                raise_on_status=False,
+            )
+            adapter = HTTPAdapter(pool_connections=POOL_SIZE, pool_maxsize=POOL_SIZE, max_retries=retry)
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            __session = session
+
+    return __session
+
+
+__host_locks = {}
+__host_next_request_time = {}
+__host_locks_lock = threading.Lock()
+
+
+def throttle(url: str):
+    """
+    Blocks until a request to the url's host is allowed by HOST_MIN_INTERVALS.
+    :param url: The url about to be requested
+    """
+    host = urlparse(url).hostname
+    min_interval = HOST_MIN_INTERVALS.get(host, 0)
+    if min_interval <= 0:
+        return
+
+    with __host_locks_lock:
+        host_lock = __host_locks.setdefault(host, threading.Lock())
+
+    # Requests to the same host line up behind each other, each reserving the next time slot
+    with host_lock:
+        now = time.monotonic()
+        request_time = max(now, __host_next_request_time.get(host, now))
+        __host_next_request_time[host] = request_time + min_interval
+
+    time.sleep(request_time - now)
+
+
+def get(url: str, timeout=DEFAULT_TIMEOUT, **kwargs) -> "requests.Response":
+    """
+    Makes a GET request with the shared session, respecting the per-host rate limits.
+    :param url: The url
+    :param timeout: Seconds to wait on the server before giving up, either a single number or (connect, read)
+    :param kwargs: Passed on to requests, i.e. headers and cookies
+    :return: The response
+    """
+    throttle(url)
+
+    return get_session().get(url, timeout=timeout, **kwargs)
+
+
+def write_if_changed(output_file: Path, content: bytes) -> bool:
+    """
+    Writes the content to disk, unless the file already has exactly that content. Leaving unchanged files alone
+    keeps the scrape workflow from making no-op data commits (which would trigger a redeploy).
+
+    :param output_file: The file to write
+    :param content: The new file contents
+    :return: True if the file was written
+    """
+    if output_file.exists():
+        with open(output_file, "rb") as f:
+            if f.read() == content:
+                return False
+
+    with open(output_file, "wb") as f:
+        f.write(content)
+
+    return True
+
+
+def write_json_if_changed(output_file: Path, json_data) -> bool:
+    """
+    Writes json data to disk in the same format as the rest of the downloaded data, unless it is unchanged.
+
+    :param output_file: The file to write
+    :param json_data: The json data
+    :return: True if the file was written
+    """
+    return write_if_changed(output_file, bytes(json.dumps(json_data, indent=4), "utf-8"))
+
+
+def load_download_state(output_file: Path) -> Dict[str, str]:
+    """
+    Gets the validators (ETag / Last-Modified) saved from the last time this file was downloaded.
+
+    :param output_file: The downloaded file
+    :return: The saved validators. Empty if the file was never downloaded, or no longer exists
+    """
+    state_file = output_file.parent / DOWNLOAD_STATE_FILENAME
+    if not output_file.exists() or not state_file.exists():
+        return {}
+
+    with open(state_file, "r") as f:
+        return json.load(f).get(output_file.name, {})
+
+
+def save_download_state(output_file: Path, response_headers):
+    """
+    Saves the validators from a response, so the next download can be made conditional.
+
+    :param output_file: The downloaded file
+    :param response_headers: The headers of the response the file came from
+    """
+    state_file = output_file.parent / DOWNLOAD_STATE_FILENAME
+
+    all_state = {}
+    if state_file.exists():
+        with open(state_file, "r") as f:
+            all_state = json.load(f)
+
+    state = {}
+    if "ETag" in response_headers:
+        state["etag"] = response_headers["ETag"]
+    if "Last-Modified" in response_headers:
+        state["last_modified"] = response_headers["Last-Modified"]
+    all_state[output_file.name] = state
+
+    write_json_if_changed(state_file, all_state)
+
+
+def conditional_headers(state: Dict[str, str]) -> Dict[str, str]:
+    """
+    Turns saved validators into request headers. The server responds with 304 Not Modified if nothing changed.
+
+    :param state: The validators, as returned by load_download_state
+    :return: The request headers
+    """
+    headers = {}
+    if "etag" in state:
+        headers["If-None-Match"] = state["etag"]
+    if "last_modified" in state:
+        headers["If-Modified-Since"] = state["last_modified"]
+
+    return headers
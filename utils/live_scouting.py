@@ -0,0 +1,163 @@
+import csv
+import hashlib
+import io
+from pathlib import Path
+from typing import Callable, List, NamedTuple, Optional, Tuple
+
+import pandas as pd
+
+from utils import scouting_utils
+from utils.figure_cache import data_version
+
+
+# How often the app checks match_scouting.csv for new rows
+POLL_SECONDS = 60
+
+
+class ScoutingUpdate(NamedTuple):
+    """
+    What changed in the scouting data after a refresh.
+    """
+
+    # The processed rows that were added. After a full reload this is all of the data
+    new_rows: pd.DataFrame
+
+    # The file was rewritten rather than appended to (i.e. a scout went back and fixed a match), so anything built
+    # from the old data has to be rebuilt rather than updated
+    full_reload: bool
+
+
+class LiveMatchScouting:
+    """
+    The match scouting data of the current event, kept up to date with match_scouting.csv while the app is running.
+
+    ScoutRadioz exports are sorted by match, so during quals new data shows up as rows appended to the end of the
+    file. Only that tail is parsed and processed, and the team aggregates are only redone for the teams that played.
+    If anything before the tail changed, the whole file is reloaded.
+
+    Anything that can be updated with just the new rows can register a listener, everything else should be keyed
+    on version.
+    """
+
+    def __init__(self, df: pd.DataFrame, csv_file: Optional[Path] = None):
+        """
+        :param df: The processed scouting data, i.e. as loaded from the event cache
+        :param csv_file: The match_scouting.csv the data was loaded from. Without it the data never changes, i.e. in
+            the shinylive version of the app
+        """
+        self.csv_file = csv_file
+        self.__set_data(df, scouting_utils.aggregate_by_team(df))
+        self.__listeners: List[Callable[[ScoutingUpdate], None]] = []
+
+        # How much of the file has been parsed, a hash of those bytes to notice when they change, and the header to
+        # parse the tail with
+        self.__offset = 0
+        self.__prefix_hash = None
+        self.__header = b""
+        if csv_file is not None and csv_file.exists():
+            content = csv_file.read_bytes()
+            self.__offset, self.__header = self.__complete_length(content, 0), self.__header_line(content)
+            self.__prefix_hash = hashlib.sha1(content[: self.__offset]).hexdigest()
+
+    def __set_data(self, df: pd.DataFrame, team_aggregates: pd.DataFrame):
+        self.df = df
+        self.team_aggregates = team_aggregates
+        self.version = data_version(df)
+
+    def add_listener(self, listener: Callable[[ScoutingUpdate], None]):
+        """
+        :param listener: Called with every ScoutingUpdate, after the data has been updated
+        """
+        self.__listeners.append(listener)
+
+    def signature(self) -> Optional[Tuple[int, int]]:
+        """
+        A cheap check for whether the file might have changed, for reactive.poll.
+
+        :return: The size and modification time of the file
+        """
+        if self.csv_file is None or not self.csv_file.exists():
+            return None
+
+        stat = self.csv_file.stat()
+        return stat.st_size, stat.st_mtime_ns
+
+    def refresh(self) -> Optional[ScoutingUpdate]:
+        """
+        Picks up any new rows in the file.
+
+        :return: What changed, or None if nothing did
+        """
+        if self.csv_file is None or not self.csv_file.exists():
+            return None
+
+        content = self.csv_file.read_bytes()
+        if len(content) < self.__offset or hashlib.sha1(content[: self.__offset]).hexdigest() != self.__prefix_hash:
+            return self.__reload(content)
+
+        end = self.__complete_length(content, self.__offset)
+        tail = content[self.__offset : end].lstrip(b"\r\n")
+        if not tail:
+            return None
+
+        new_rows = scouting_utils.process_match_scouting(pd.read_csv(io.BytesIO(self.__header + b"\n" + tail)))
+        new_rows.index = pd.RangeIndex(len(self.df), len(self.df) + len(new_rows))
+        df = pd.concat([self.df, self.__match_dtypes(new_rows)])
+
+        self.__set_data(df, scouting_utils.update_team_aggregates(self.team_aggregates, df, new_rows["team_key"].unique()))
+        self.__offset = end
+        self.__prefix_hash = hashlib.sha1(content[:end]).hexdigest()
+
+        return self.__notify(ScoutingUpdate(new_rows=new_rows, full_reload=False))
+
+    def __reload(self, content: bytes) -> ScoutingUpdate:
+        end = self.__complete_length(content, 0)
+        df = scouting_utils.process_match_scouting(pd.read_csv(io.BytesIO(content[:end])))
+
+        self.__set_data(df, scouting_utils.aggregate_by_team(df))
+        self.__offset = end
+        self.__prefix_hash = hashlib.sha1(content[:end]).hexdigest()
+        self.__header = self.__header_line(content)
+
+        return self.__notify(ScoutingUpdate(new_rows=df, full_reload=True))
+
+    def __notify(self, update: ScoutingUpdate) -> ScoutingUpdate:
+        for listener in self.__listeners:
+            listener(update)
+        return update
+
+    def __match_dtypes(self, new_rows: pd.DataFrame) -> pd.DataFrame:
+        """
+        A handful of rows don't have every value, so pandas can guess different types for them than it did for the
+        whole file. Cast them back, so the combined data frame keeps its types.
+        """
+        for column, dtype in self.df.dtypes.items():
+            if column in new_rows.columns and new_rows[column].dtype != dtype:
+                try:
+                    new_rows[column] = new_rows[column].astype(dtype)
+                except (TypeError, ValueError):
+                    pass
+        return new_rows
+
+    @staticmethod
+    def __header_line(content: bytes) -> bytes:
+        return content.split(b"\n", 1)[0].rstrip(b"\r")
+
+    @staticmethod
+    def __complete_length(content: bytes, start: int) -> int:
+        """
+        How much of the file, from the start, is complete rows. ScoutRadioz doesn't end the file with a newline, so
+        the last line counts if it has every column. A row that is still being written is left for the next refresh.
+        """
+        end = content.rfind(b"\n", start) + 1 if b"\n" in content[start:] else start
+        last_line = content[end:]
+        if not last_line.strip():
+            return len(content)
+
+        header = LiveMatchScouting.__header_line(content)
+        fields = next(csv.reader([last_line.decode(errors="replace")]), [])
+        columns = next(csv.reader([header.decode(errors="replace")]), [])
+        if last_line.count(b'"') % 2 == 0 and len(fields) == len(columns):
+            return len(content)
+
+        return end
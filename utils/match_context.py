@@ -0,0 +1,154 @@
+from typing import Dict, NamedTuple, Sequence, Tuple
+
+import pandas as pd
+
+from utils.tba_utils import TEAM_COLUMNS, event_match_teams
+
+RED_COLOR = "#FF5733"
+BLUE_COLOR = "#1F77B4"
+
+
+class MatchLineup(NamedTuple):
+    """
+    The teams playing in a qualification match.
+    """
+
+    red_teams: Tuple[str, ...]
+    blue_teams: Tuple[str, ...]
+
+
+class MatchPrediction(NamedTuple):
+    """
+    What Statbotics expects each alliance to score in a qualification match.
+    """
+
+    red_score: float
+    blue_score: float
+
+
+def build_match_index(matches_df: pd.DataFrame) -> Dict[int, MatchLineup]:
+    """
+    Builds a match number -> lineup lookup table, so selecting a match doesn't need to search the data frames.
+
+    :param matches_df: The TBA qualification matches, as returned by tba_utils.load_event_matches
+    :return: The lookup table
+    """
+    if matches_df.empty:
+        return {}
+
+    # The long table is sorted by match and then red1..blue3, so every six rows are one match
+    match_teams = event_match_teams(matches_df)
+    teams = match_teams["team_key"].to_numpy().reshape(-1, len(TEAM_COLUMNS))
+    match_numbers = match_teams["match_number"].to_numpy()[:: len(TEAM_COLUMNS)]
+
+    return {
+        int(match_number): MatchLineup(red_teams=tuple(lineup[:3]), blue_teams=tuple(lineup[3:]))
+        for match_number, lineup in zip(match_numbers, teams)
+    }
+
+
+def build_prediction_index(match_index: Dict[int, MatchLineup], statbotics_df: pd.DataFrame) -> Dict[int, MatchPrediction]:
+    """
+    Builds a match number -> predicted score lookup table. Kept apart from the match index, so the Statbotics data
+    only has to be loaded once something actually shows a prediction.
+
+    :param match_index: The match index, as returned by build_match_index
+    :param statbotics_df: The Statbotics matches, as returned by statbotics_utils.load_statbotics_matches
+    :return: The lookup table. Matches Statbotics doesn't know about are predicted to score 0
+    """
+    predictions = pd.DataFrame(0.0, index=list(match_index), columns=["pred.red_score", "pred.blue_score"])
+    if not statbotics_df.empty:
+        quals = statbotics_df[statbotics_df["comp_level"] == "qm"].set_index("match_number")
+        predictions.update(quals[["pred.red_score", "pred.blue_score"]])
+
+    return {
+        int(match_number): MatchPrediction(red_score=float(red_score), blue_score=float(blue_score))
+        for match_number, red_score, blue_score in predictions.itertuples()
+    }
+
+
+def build_team_schedule(matches_df: pd.DataFrame) -> Dict[str, Tuple[int, ...]]:
+    """
+    Builds a team -> match numbers lookup table, so filtering the matches by team doesn't need to search the data
+    frame. Teams are matched exactly, so i.e. 4467 does not pick up the matches of 44670.
+
+    :param matches_df: The TBA qualification matches, as returned by tba_utils.load_event_matches
+    :return: The lookup table. The team keys do not have the "frc" prefix
+    """
+    if matches_df.empty:
+        return {}
+
+    # Already sorted by match number
+    schedule = event_match_teams(matches_df).groupby("team_key")["match_number"].agg(tuple)
+
+    return schedule.to_dict()
+
+
+class MatchContext(NamedTuple):
+    """
+    Everything the match preview renderers need to know about the selected lineup. This is computed once per
+    selection and shared by every renderer, so they should treat the data frames as read only.
+    """
+
+    red_teams: Tuple[str, ...]
+    blue_teams: Tuple[str, ...]
+
+    # team key -> "red" / "blue"
+    alliance: Dict[str, str]
+
+    # team key -> plot color
+    color_map: Dict[str, str]
+
+    # The raw scouting rows for all six teams, sorted in alliance order
+    scouted: pd.DataFrame
+
+    # The average stats for all six teams, sorted in alliance order
+    averages: pd.DataFrame
+
+    # The sum of the team averages for each alliance, i.e. alliance_totals["red"]["endgamePoints"]
+    alliance_totals: Dict[str, pd.Series]
+
+    @property
+    def all_teams(self) -> Tuple[str, ...]:
+        return self.red_teams + self.blue_teams
+
+
+def create_match_context(
+    red_teams: Sequence[str],
+    blue_teams: Sequence[str],
+    scouted: pd.DataFrame,
+    averages: pd.DataFrame,
+) -> MatchContext:
+    """
+    Builds the match context for an alliance lineup.
+
+    :param red_teams: The red alliance team keys
+    :param blue_teams: The blue alliance team keys
+    :param scouted: The raw scouting rows for the teams in the match, in alliance order
+    :param averages: The average stats for the teams in the match, in alliance order
+    :return: The match context
+    """
+    red_teams = tuple(red_teams)
+    blue_teams = tuple(blue_teams)
+
+    # Red wins if a team was (mistakenly) picked for both alliances
+    alliance = {team: "blue" for team in blue_teams}
+    alliance.update({team: "red" for team in red_teams})
+
+    color_map = {team: RED_COLOR if color == "red" else BLUE_COLOR for team, color in alliance.items()}
+
+    numeric_averages = averages.select_dtypes(include="number")
+    alliance_totals = {
+        "red": numeric_averages[averages["team_key"].map(alliance) == "red"].sum(),
+        "blue": numeric_averages[averages["team_key"].map(alliance) == "blue"].sum(),
+    }
+
+    return MatchContext(
+        red_teams=red_teams,
+        blue_teams=blue_teams,
+        alliance=alliance,
+        color_map=color_map,
+        scouted=scouted,
+        averages=averages,
+        alliance_totals=alliance_totals,
+    )
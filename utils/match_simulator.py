@@ -0,0 +1,370 @@
+from typing import Dict, NamedTuple, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+from utils import scouting_utils
+from utils.match_context import MatchLineup
+
+
+SIMULATION_SAMPLES = 10000
+
+# How many (match, sample, robot, metric) values are simulated at once when simulating a whole schedule
+SIMULATION_CHUNK_ELEMENTS = 4_000_000
+
+# REEFSCAPE ranking points
+WIN_RP = 3
+TIE_RP = 1
+
+
+class RankingPointRules(NamedTuple):
+    """
+    The thresholds of the REEFSCAPE bonus ranking points. They go up at district championships and the championship.
+    """
+
+    # Auto RP: every robot leaves its starting zone, and the alliance scores at least this much coral in auto
+    auto_coral: int = 1
+
+    # Coral RP: at least this much coral on every level of the reef. Coopertition is not simulated
+    coral_per_level: int = 5
+
+    # Barge RP: at least this many endgame points
+    barge_points: int = 14
+
+
+# Event type -> the bonus ranking point thresholds of the game manual
+RP_RULES = {
+    "regional": RankingPointRules(coral_per_level=5, barge_points=14),
+    "district": RankingPointRules(coral_per_level=5, barge_points=14),
+    "district_championship": RankingPointRules(coral_per_level=6, barge_points=15),
+    "championship": RankingPointRules(coral_per_level=7, barge_points=16),
+}
+DEFAULT_RP_RULES = RP_RULES["regional"]
+
+# The bonus ranking points each alliance can earn on top of the win / tie ones
+BONUS_RP_NAMES = ["auto", "coral", "barge"]
+
+# The scouted columns that are sampled for each robot
+SAMPLED_COLUMNS = [
+    "totalPointsScored",
+    "totalAutoPoints",
+    "totalTeleopPoints",
+    "endgamePoints",
+    "didLeaveStartingZone",
+    "totalAutoCoral",
+    "coralL1",
+    "coralL2",
+    "coralL3",
+    "coralL4",
+]
+
+
+class ScoutingSamples(NamedTuple):
+    """
+    Every scouted match of every team, laid out so that drawing random matches for a lineup is a single indexing
+    operation. Team i's matches are the rows offsets[i] to offsets[i] + counts[i] of values.
+    """
+
+    team_index: Dict[str, int]
+    offsets: np.ndarray
+    counts: np.ndarray
+
+    # (scouted match, SAMPLED_COLUMNS)
+    values: np.ndarray
+
+
+class SimulatedOutcomes(NamedTuple):
+    """
+    The result of every simulated sample of a set of matches. Each array is (match, sample).
+    """
+
+    red_score: np.ndarray
+    blue_score: np.ndarray
+    red_rp: np.ndarray
+    blue_rp: np.ndarray
+
+    # Ranking point name -> whether the alliance earned it
+    red_bonus_rp: Dict[str, np.ndarray]
+    blue_bonus_rp: Dict[str, np.ndarray]
+
+
+class MatchSimulation(NamedTuple):
+    """
+    The simulated outcome of a single match.
+    """
+
+    red_scores: np.ndarray
+    blue_scores: np.ndarray
+    red_win_probability: float
+    blue_win_probability: float
+    tie_probability: float
+
+    # Ranking point name -> probability of earning it, i.e. red_rp_probabilities["coral"]
+    red_rp_probabilities: Dict[str, float]
+    blue_rp_probabilities: Dict[str, float]
+
+    red_expected_rp: float
+    blue_expected_rp: float
+
+    # Teams in the lineup with neither scouting data nor a fallback row. They are simulated as scoring nothing
+    unscouted_teams: Sequence[str]
+
+
+def calibrate_rp_rules(matches_df: pd.DataFrame, default: RankingPointRules = DEFAULT_RP_RULES) -> RankingPointRules:
+    """
+    Picks the RP_RULES that agree best with the bonus ranking points TBA gave the matches played so far, so the
+    simulation uses the thresholds the event is actually played with.
+
+    Barge points come in steps of 2, 6 and 12, so the thresholds can't be read off the results directly. Alliances
+    that met coopertition are left out of the coral check, since they needed less coral. Some bonus RP are awarded
+    by penalties, which is why the rules that agree best are picked rather than ones that agree on every match.
+
+    :param matches_df: The TBA qualification matches, as returned by tba_utils.load_event_matches
+    :param default: The rules to use if no matches have been played, and to prefer when they explain the results
+        just as well, i.e. RP_RULES[event type]
+    :return: The rules
+    """
+    fields = ["endGameBargePoints", "bargeBonusAchieved", "coralBonusAchieved", "coopertitionCriteriaMet"] + [
+        f"teleopReef.{level}" for level in ["trough", "tba_botRowCount", "tba_midRowCount", "tba_topRowCount"]
+    ]
+
+    per_alliance = []
+    for alliance in ["red", "blue"]:
+        columns = [f"score_breakdown.{alliance}.{field}" for field in fields]
+        if not set(columns).issubset(matches_df.columns):
+            return default
+        breakdown = matches_df[columns].set_axis(fields, axis=1)
+        per_alliance.append(breakdown.dropna(subset=["endGameBargePoints", "bargeBonusAchieved", "coralBonusAchieved"]))
+
+    played = pd.concat(per_alliance)
+    if played.empty:
+        return default
+
+    barge_points = played["endGameBargePoints"].to_numpy(dtype=float)
+    barge_achieved = played["bargeBonusAchieved"].astype(bool).to_numpy()
+
+    without_coopertition = ~played["coopertitionCriteriaMet"].fillna(False).astype(bool).to_numpy()
+    fewest_coral = played[fields[4:]].min(axis=1).to_numpy(dtype=float)[without_coopertition]
+    coral_achieved = played["coralBonusAchieved"].astype(bool).to_numpy()[without_coopertition]
+
+    def disagreements(rules: RankingPointRules):
+        barge = ((barge_points >= rules.barge_points) != barge_achieved).sum()
+        coral = ((fewest_coral >= rules.coral_per_level) != coral_achieved).sum()
+        return barge + coral, rules != default
+
+    return min(RP_RULES.values(), key=disagreements)
+
+
+def build_scouting_samples(df: pd.DataFrame, fallback: Optional[pd.DataFrame] = None) -> ScoutingSamples:
+    """
+    Prepares the scouting data for simulation.
+
+    :param df: The scouting data, with derived columns already added
+    :param fallback: Stand in rows for teams with no scouting data, i.e. as returned by
+        component_opr.opr_scouting_rows. Each one is simulated as the team's only match
+    :return: The samples
+    """
+    df = scouting_utils.add_fallback_rows(df, fallback).sort_values("team_key", kind="stable")
+
+    counts = df.groupby("team_key", sort=False).size()
+    offsets = np.concatenate([[0], np.cumsum(counts.to_numpy())[:-1]])
+
+    levels = {f"coralL{level}": df[f"autoCoralL{level}"] + df[f"teleopCoralL{level}"] for level in range(1, 5)}
+    # Every column is a small count or point total, which float32 holds exactly at half the memory traffic
+    values = df.assign(**levels)[SAMPLED_COLUMNS].to_numpy(dtype=np.float32)
+
+    return ScoutingSamples(
+        team_index={str(team): i for i, team in enumerate(counts.index)},
+        offsets=offsets.astype(np.intp),
+        counts=counts.to_numpy().astype(np.intp),
+        values=values,
+    )
+
+
+def simulate_lineups(
+    samples: ScoutingSamples,
+    lineups: Sequence[MatchLineup],
+    sample_count: int = SIMULATION_SAMPLES,
+    rng: Optional[np.random.Generator] = None,
+    rules: RankingPointRules = DEFAULT_RP_RULES,
+) -> SimulatedOutcomes:
+    """
+    Simulates matches by drawing a random scouted match for every robot, sample_count times per match.
+
+    :param samples: The scouting samples, as returned by build_scouting_samples
+    :param lineups: The matches to simulate
+    :param sample_count: How many times to simulate each match
+    :param rng: The random number generator. Defaults to a fresh, unseeded one
+    :param rules: The bonus ranking point thresholds, i.e. as returned by calibrate_rp_rules
+    :return: The outcome of every sample
+    """
+    if rng is None:
+        rng = np.random.default_rng()
+    if not lineups:
+        raise ValueError("There are no matches to simulate")
+
+    # (match, robot) row offsets and counts into the samples. Unscouted teams point at an extra row of zeros
+    zero_row = len(samples.values)
+    values = np.vstack([samples.values, np.zeros((1, samples.values.shape[1]), dtype=samples.values.dtype)])
+
+    robot_indices = np.array(
+        [[samples.team_index.get(team, -1) for team in lineup.red_teams + lineup.blue_teams] for lineup in lineups],
+        dtype=np.intp,
+    ).reshape(len(lineups), -1)
+    scouted = robot_indices >= 0
+    offsets = np.where(scouted, samples.offsets[robot_indices], zero_row)
+    counts = np.where(scouted, samples.counts[robot_indices], 1)
+
+    robots_per_alliance = robot_indices.shape[1] // 2
+    chunk_size = max(1, SIMULATION_CHUNK_ELEMENTS // (sample_count * robot_indices.shape[1] * values.shape[1]))
+
+    red_chunks, blue_chunks = [], []
+    for i in range(0, len(lineups), chunk_size):
+        chunk_offsets = offsets[i : i + chunk_size, np.newaxis, :]
+        chunk_counts = counts[i : i + chunk_size, np.newaxis, :]
+
+        # (match, sample, robot) -> the scouted match that robot plays like in that sample
+        random = rng.random((len(chunk_offsets), sample_count, robot_indices.shape[1]), dtype=np.float32)
+        draws = np.minimum((random * chunk_counts).astype(np.intp), chunk_counts - 1)
+        drawn = values[chunk_offsets + draws]
+
+        red_chunks.append(__alliance_outcome(drawn[:, :, :robots_per_alliance], rules))
+        blue_chunks.append(__alliance_outcome(drawn[:, :, robots_per_alliance:], rules))
+
+    red = {key: np.concatenate([chunk[key] for chunk in red_chunks]) for key in red_chunks[0]}
+    blue = {key: np.concatenate([chunk[key] for chunk in blue_chunks]) for key in blue_chunks[0]}
+
+    red_bonus_rp = {name: red[name] for name in BONUS_RP_NAMES}
+    blue_bonus_rp = {name: blue[name] for name in BONUS_RP_NAMES}
+
+    red_result_rp = np.where(red["score"] > blue["score"], WIN_RP, np.where(red["score"] == blue["score"], TIE_RP, 0))
+    blue_result_rp = np.where(blue["score"] > red["score"], WIN_RP, np.where(red["score"] == blue["score"], TIE_RP, 0))
+
+    return SimulatedOutcomes(
+        red_score=red["score"],
+        blue_score=blue["score"],
+        red_rp=red_result_rp + sum(rp.astype(int) for rp in red_bonus_rp.values()),
+        blue_rp=blue_result_rp + sum(rp.astype(int) for rp in blue_bonus_rp.values()),
+        red_bonus_rp=red_bonus_rp,
+        blue_bonus_rp=blue_bonus_rp,
+    )
+
+
+def __alliance_outcome(drawn: np.ndarray, rules: RankingPointRules) -> Dict[str, np.ndarray]:
+    """
+    :param drawn: (match, sample, robot, SAMPLED_COLUMNS) the drawn scouted matches of one alliance
+    :param rules: The bonus ranking point thresholds
+    :return: The score and bonus ranking points of each (match, sample)
+    """
+    column = {name: i for i, name in enumerate(SAMPLED_COLUMNS)}
+    # Adding the robots one at a time is a lot faster than a strided sum over the short robot axis
+    totals = drawn[:, :, 0].copy()
+    for robot in range(1, drawn.shape[2]):
+        totals += drawn[:, :, robot]
+
+    coral_levels = totals[:, :, [column[f"coralL{level}"] for level in range(1, 5)]]
+
+    return {
+        "score": totals[:, :, column["totalPointsScored"]],
+        "auto": (totals[:, :, column["didLeaveStartingZone"]] >= drawn.shape[2]) & (totals[:, :, column["totalAutoCoral"]] >= rules.auto_coral),
+        "coral": (coral_levels >= rules.coral_per_level).all(axis=2),
+        "barge": totals[:, :, column["endgamePoints"]] >= rules.barge_points,
+    }
+
+
+def simulate_match(
+    samples: ScoutingSamples,
+    red_teams: Sequence[str],
+    blue_teams: Sequence[str],
+    sample_count: int = SIMULATION_SAMPLES,
+    seed: Optional[int] = None,
+    rules: RankingPointRules = DEFAULT_RP_RULES,
+) -> MatchSimulation:
+    """
+    Simulates a single match.
+
+    :param samples: The scouting samples, as returned by build_scouting_samples
+    :param red_teams: The red alliance team keys
+    :param blue_teams: The blue alliance team keys
+    :param sample_count: How many times to simulate the match
+    :param seed: Seed for the random number generator, so the same lineup always gets the same answer
+    :param rules: The bonus ranking point thresholds, i.e. as returned by calibrate_rp_rules
+    :return: The simulated outcome
+    """
+    if len(red_teams) != len(blue_teams):
+        raise ValueError(f"Both alliances need the same number of teams, got {red_teams} vs {blue_teams}")
+
+    lineup = MatchLineup(red_teams=tuple(red_teams), blue_teams=tuple(blue_teams))
+    outcomes = simulate_lineups(samples, [lineup], sample_count, np.random.default_rng(seed), rules)
+
+    red_scores = outcomes.red_score[0]
+    blue_scores = outcomes.blue_score[0]
+
+    return MatchSimulation(
+        red_scores=red_scores,
+        blue_scores=blue_scores,
+        red_win_probability=float(np.mean(red_scores > blue_scores)),
+        blue_win_probability=float(np.mean(blue_scores > red_scores)),
+        tie_probability=float(np.mean(red_scores == blue_scores)),
+        red_rp_probabilities={name: float(rp[0].mean()) for name, rp in outcomes.red_bonus_rp.items()},
+        blue_rp_probabilities={name: float(rp[0].mean()) for name, rp in outcomes.blue_bonus_rp.items()},
+        red_expected_rp=float(outcomes.red_rp[0].mean()),
+        blue_expected_rp=float(outcomes.blue_rp[0].mean()),
+        unscouted_teams=[team for team in lineup.red_teams + lineup.blue_teams if team not in samples.team_index],
+    )
+
+
+def simulate_schedule(
+    samples: ScoutingSamples,
+    match_index: Dict[int, MatchLineup],
+    sample_count: int = SIMULATION_SAMPLES,
+    seed: Optional[int] = None,
+    rules: RankingPointRules = DEFAULT_RP_RULES,
+) -> pd.DataFrame:
+    """
+    Simulates every match of a schedule.
+
+    :param samples: The scouting samples, as returned by build_scouting_samples
+    :param match_index: The matches to simulate, as returned by match_context.build_match_index
+    :param sample_count: How many times to simulate each match
+    :param seed: Seed for the random number generator
+    :param rules: The bonus ranking point thresholds, i.e. as returned by calibrate_rp_rules
+    :return: One row per match number, with the mean scores, the win probabilities and the expected ranking points.
+        Empty if there are no matches, i.e. the schedule hasn't been released yet
+    """
+    match_numbers = sorted(match_index)
+    if not match_numbers:
+        columns = [
+            "red_score",
+            "blue_score",
+            "red_win_probability",
+            "blue_win_probability",
+            "tie_probability",
+            "red_expected_rp",
+            "blue_expected_rp",
+        ]
+        columns += [f"{color}_{name}_rp_probability" for name in BONUS_RP_NAMES for color in ["red", "blue"]]
+        return pd.DataFrame(columns=columns, index=pd.Index([], name="match_number"), dtype=float)
+
+    outcomes = simulate_lineups(
+        samples,
+        [match_index[match_number] for match_number in match_numbers],
+        sample_count,
+        np.random.default_rng(seed),
+        rules,
+    )
+
+    summary = {
+        "red_score": outcomes.red_score.mean(axis=1),
+        "blue_score": outcomes.blue_score.mean(axis=1),
+        "red_win_probability": (outcomes.red_score > outcomes.blue_score).mean(axis=1),
+        "blue_win_probability": (outcomes.blue_score > outcomes.red_score).mean(axis=1),
+        "tie_probability": (outcomes.red_score == outcomes.blue_score).mean(axis=1),
+        "red_expected_rp": outcomes.red_rp.mean(axis=1),
+        "blue_expected_rp": outcomes.blue_rp.mean(axis=1),
+    }
+    for name in outcomes.red_bonus_rp:
+        summary[f"red_{name}_rp_probability"] = outcomes.red_bonus_rp[name].mean(axis=1)
+        summary[f"blue_{name}_rp_probability"] = outcomes.blue_bonus_rp[name].mean(axis=1)
+
+    return pd.DataFrame(summary, index=pd.Index(match_numbers, name="match_number"))
@@ -0,0 +1,208 @@
+from typing import Dict, Iterable, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from utils import scouting_utils
+from utils.derived_metrics import REEFSCAPE_2025
+
+
+PICK_LIST_SAMPLES = 2000
+
+# How much coral fits on each level of an alliance's reef, one per branch. The trough (L1) holds as much as gets
+# piled in. The TBA score breakdowns never show more than 12 on L2-L4
+REEF_CAPACITY = {"L1": np.inf, "L2": 12, "L3": 12, "L4": 12}
+
+# The most algae (net + processor) one alliance scored in a match at the events we have TBA results for (2025mil).
+# Processed algae come back through the human player, so this is more than the algae on the field. Used until the
+# current event has results of its own
+DEFAULT_ALGAE_CAPACITY = 15
+
+# The endgame isn't capped. The barge has a cage for every robot, and TBA shows alliances with all three robots on
+# a deep cage (35 of 250 at 2025mil), so the robots' endgame points add up
+
+CORAL_LEVELS = ["L1", "L2", "L3", "L4"]
+PHASES = ["auto", "teleop"]
+ALGAE_COLUMNS = ["autoAlgaeNet", "autoAlgaeProc", "teleopAlgaeNet", "teleopAlgaeProc"]
+
+PICK_LIST_COLUMNS = ["team_key", "alliance_score", "added_score", "coral_points", "algae_points", "endgame_points", "capacity_loss"]
+
+SAMPLED_COLUMNS = [f"{phase}Coral{level}" for phase in PHASES for level in CORAL_LEVELS] + ALGAE_COLUMNS + ["endgamePoints"]
+
+
+def algae_capacity_from_results(matches_df: pd.DataFrame, default: float = DEFAULT_ALGAE_CAPACITY) -> float:
+    """
+    The most algae one alliance has scored in a match at the event, so that no alliance that was actually played
+    would be capped.
+
+    :param matches_df: The TBA qualification matches, as returned by tba_utils.load_event_matches
+    :param default: The capacity to use if no matches have been played yet
+    :return: The algae capacity of an alliance
+    """
+    columns = [f"score_breakdown.{alliance}.{field}" for alliance in ["red", "blue"] for field in ["netAlgaeCount", "wallAlgaeCount"]]
+    if not set(columns).issubset(matches_df.columns):
+        return default
+
+    algae = pd.concat([
+        matches_df[f"score_breakdown.{alliance}.netAlgaeCount"] + matches_df[f"score_breakdown.{alliance}.wallAlgaeCount"]
+        for alliance in ["red", "blue"]
+    ]).dropna()
+
+    return float(algae.max()) if not algae.empty else default
+
+
+class PickList:
+    """
+    Ranks the teams that are still available in alliance selection by how much they add to our alliance.
+
+    Every team's scouted matches are resampled once up front, and alliances are scored on those same samples, so
+    that two candidates are always compared on equal footing. A candidate's score is the expected points of the
+    alliance with them on it, after the alliance runs out of room on the reef or algae to score.
+
+    Scores are cached per alliance, so when another alliance picks a team it is simply dropped from the list, and
+    when our alliance changes only the candidates that are still available are scored against the new alliance.
+    """
+
+    def __init__(
+        self,
+        df: pd.DataFrame,
+        sample_count: int = PICK_LIST_SAMPLES,
+        seed: Optional[int] = 0,
+        algae_capacity: float = DEFAULT_ALGAE_CAPACITY,
+        fallback: Optional[pd.DataFrame] = None,
+    ):
+        """
+        :param df: The scouting data, with derived columns already added
+        :param sample_count: How many matches to simulate for each alliance
+        :param seed: Seed for the resampling, so the list doesn't shuffle around between page loads
+        :param algae_capacity: How many algae one alliance can score in a match, i.e. as returned by
+            algae_capacity_from_results
+        :param fallback: Stand in rows for teams with no scouting data, i.e. as returned by
+            component_opr.opr_scouting_rows. Each one is resampled as the team's only match
+        """
+        self.algae_capacity = algae_capacity
+        df = scouting_utils.add_fallback_rows(df, fallback)
+        self.team_keys, self.__team_samples = self.__resample_teams(df, sample_count, np.random.default_rng(seed))
+        self.__team_positions = {team: i for i, team in enumerate(self.team_keys)}
+        self.__column = {name: i for i, name in enumerate(SAMPLED_COLUMNS)}
+
+        # alliance -> candidate -> score row
+        self.__scores: Dict[Tuple[str, ...], Dict[str, dict]] = {}
+        self.scored_candidates = 0
+
+    def rank(self, alliance: Sequence[str], unavailable: Iterable[str] = ()) -> pd.DataFrame:
+        """
+        Ranks the candidates for the next pick of an alliance.
+
+        :param alliance: The teams already on the alliance, i.e. just our team for the first pick
+        :param unavailable: Teams that can't be picked anymore, because they are on another alliance or declined
+        :return: One row per available scouted team, best first. The expected alliance score with them, what they
+            add to it, the coral / algae / endgame split of the alliance score, and the points lost to the alliance
+            running out of room on the reef or algae
+        """
+        alliance_key = tuple(sorted(team for team in alliance if team in self.__team_positions))
+        unavailable = set(unavailable) | set(alliance)
+
+        cached = self.__scores.setdefault(alliance_key, {})
+        candidates = [team for team in self.team_keys if team not in unavailable]
+
+        missing = [team for team in candidates if team not in cached]
+        if missing:
+            cached.update(self.__score_candidates(alliance_key, missing))
+            self.scored_candidates += len(missing)
+
+        if not candidates:
+            return pd.DataFrame(columns=PICK_LIST_COLUMNS)
+
+        base_score = self.__alliance_points(self.__alliance_samples(alliance_key)[np.newaxis])["total"].mean()
+
+        ranked = pd.DataFrame([cached[team] for team in candidates])
+        ranked.insert(2, "added_score", ranked["alliance_score"] - base_score)
+
+        return ranked.sort_values("alliance_score", ascending=False).reset_index(drop=True)
+
+    @staticmethod
+    def __resample_teams(df: pd.DataFrame, sample_count: int, rng: np.random.Generator):
+        """
+        :return: The team keys, and a (team, sample, SAMPLED_COLUMNS) array of randomly drawn scouted matches
+        """
+        team_codes, team_keys = pd.factorize(df["team_key"], sort=True)
+        order = np.argsort(team_codes, kind="stable")
+        values = df[SAMPLED_COLUMNS].to_numpy(dtype=float)[order]
+
+        counts = np.bincount(team_codes, minlength=len(team_keys))
+        offsets = np.concatenate([[0], np.cumsum(counts)[:-1]])
+
+        draws = offsets[:, np.newaxis] + np.floor(rng.random((len(team_keys), sample_count)) * counts[:, np.newaxis]).astype(np.intp)
+
+        return [str(team) for team in team_keys], values[draws]
+
+    def __alliance_samples(self, alliance_key: Tuple[str, ...]) -> np.ndarray:
+        """
+        (sample, SAMPLED_COLUMNS) combined output of the alliance, before any capacity limits.
+        """
+        positions = [self.__team_positions[team] for team in alliance_key]
+        return self.__team_samples[positions].sum(axis=0)
+
+    def __score_candidates(self, alliance_key: Tuple[str, ...], candidates: Sequence[str]) -> Dict[str, dict]:
+        positions = [self.__team_positions[team] for team in candidates]
+
+        # (candidate, sample, SAMPLED_COLUMNS)
+        combined = self.__team_samples[positions] + self.__alliance_samples(alliance_key)[np.newaxis]
+        points = {name: value.mean(axis=1) for name, value in self.__alliance_points(combined).items()}
+
+        return {
+            team: {
+                "team_key": team,
+                "alliance_score": points["total"][i],
+                "coral_points": points["coral"][i],
+                "algae_points": points["algae"][i],
+                "endgame_points": points["endgame"][i],
+                "capacity_loss": points["capacity_loss"][i],
+            }
+            for i, team in enumerate(candidates)
+        }
+
+    def __alliance_points(self, combined: np.ndarray) -> Dict[str, np.ndarray]:
+        """
+        :param combined: (candidate, sample, SAMPLED_COLUMNS) combined output of each alliance
+        :return: (candidate, sample) points of each alliance, limited by the room on the reef and the algae available
+        """
+        piece_points = REEFSCAPE_2025.piece_points
+        column = self.__column
+
+        coral = np.zeros(combined.shape[:2])
+        uncapped_coral = np.zeros(combined.shape[:2])
+        for level in CORAL_LEVELS:
+            auto = combined[:, :, column[f"autoCoral{level}"]]
+            teleop = combined[:, :, column[f"teleopCoral{level}"]]
+
+            # Auto is scored first, so teleop coral is what doesn't fit
+            teleop_capped = np.minimum(teleop, np.maximum(REEF_CAPACITY[level] - auto, 0))
+            auto_capped = np.minimum(auto, REEF_CAPACITY[level])
+
+            auto_points = piece_points[f"autoCoral{level}"]
+            teleop_points = piece_points[f"teleopCoral{level}"]
+            coral += auto_capped * auto_points + teleop_capped * teleop_points
+            uncapped_coral += auto * auto_points + teleop * teleop_points
+
+        algae_counts = combined[:, :, [column[name] for name in ALGAE_COLUMNS]]
+        algae_values = np.array([piece_points[name] for name in ALGAE_COLUMNS])
+        uncapped_algae = algae_counts @ algae_values
+
+        # Drop the excess algae proportionally
+        algae_total = algae_counts.sum(axis=2)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            algae_scale = np.where(algae_total > self.algae_capacity, self.algae_capacity / algae_total, 1)
+        algae = uncapped_algae * algae_scale
+
+        endgame = combined[:, :, column["endgamePoints"]]
+
+        return {
+            "total": coral + algae + endgame,
+            "coral": coral,
+            "algae": algae,
+            "endgame": endgame,
+            "capacity_loss": (uncapped_coral - coral) + (uncapped_algae - algae),
+        }
+
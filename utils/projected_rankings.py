@@ -0,0 +1,215 @@
+from typing import NamedTuple, Optional
+
+import numpy as np
+import pandas as pd
+
+from utils import match_simulator
+from utils.match_context import MatchLineup
+from utils.tba_utils import event_match_teams
+
+RANKING_ITERATIONS = 10000
+
+# Only the top of the rankings picks alliances, so these are reported for every team
+TOP_RANK_CUTOFFS = [1, 8, 16]
+
+SUMMARY_COLUMNS = [
+    "team_key",
+    "current_rp",
+    "current_score",
+    "expected_rp",
+    "expected_score",
+    "expected_ranking_score",
+    "mean_rank",
+    "median_rank",
+    "best_rank",
+    "worst_rank",
+] + [f"top_{cutoff}_probability" for cutoff in TOP_RANK_CUTOFFS]
+
+
+class ProjectedRankings(NamedTuple):
+    """
+    The simulated final standings of an event.
+    """
+
+    # One row per team, sorted by expected rank, with SUMMARY_COLUMNS. The ranking points and match points so far,
+    # the expected final totals and ranking score, the mean / median / best / worst rank, and the probability of
+    # finishing in each TOP_RANK_CUTOFFS
+    summary: pd.DataFrame
+
+    # team key x final rank -> probability
+    rank_probabilities: pd.DataFrame
+
+    # The number of qualification matches that were simulated
+    remaining_matches: int
+
+
+def project_rankings(
+    matches_df: pd.DataFrame,
+    samples: match_simulator.ScoutingSamples,
+    iterations: int = RANKING_ITERATIONS,
+    played_through: Optional[int] = None,
+    seed: Optional[int] = None,
+    rules: match_simulator.RankingPointRules = match_simulator.DEFAULT_RP_RULES,
+) -> ProjectedRankings:
+    """
+    Projects the final qualification rankings. The matches that have been played count with the ranking points TBA
+    gave them, every remaining match is simulated iterations times with the match simulator.
+
+    Teams are ranked like the official ranking score, by average ranking points per match, with ties broken by
+    average match points. A team playing a surrogate match doesn't get anything for it, and it doesn't count
+    towards their number of matches.
+
+    :param matches_df: The TBA qualification matches, as returned by tba_utils.load_event_matches
+    :param samples: The scouting samples, as returned by match_simulator.build_scouting_samples
+    :param iterations: How many times to simulate the rest of the schedule
+    :param played_through: Treat only the matches up to and including this match number as played, i.e. to see
+        what the projection looked like earlier in the event. Defaults to every match that has a score
+    :param seed: Seed for the random number generator
+    :param rules: The bonus ranking point thresholds, i.e. as returned by match_simulator.calibrate_rp_rules
+    :return: The projected rankings
+    """
+    rng = np.random.default_rng(seed)
+
+    teams = event_match_teams(matches_df)
+    if teams.empty:
+        # The schedule hasn't been released yet
+        return ProjectedRankings(
+            summary=pd.DataFrame(columns=SUMMARY_COLUMNS),
+            rank_probabilities=pd.DataFrame(index=pd.Index([], name="team_key"), columns=pd.Index([], name="rank")),
+            remaining_matches=0,
+        )
+
+    teams["rp"] = __alliance_column(matches_df, teams, "score_breakdown.{alliance}.rp", missing=0)
+    teams["score"] = __alliance_column(matches_df, teams, "alliances.{alliance}.score", missing=-1)
+    teams["surrogate"] = __surrogate_flags(matches_df, teams)
+
+    # TBA gives unplayed matches a score of -1
+    played = teams["score"] >= 0
+    if played_through is not None:
+        played &= teams["match_number"] <= played_through
+
+    team_keys = np.array(sorted(teams["team_key"].unique(), key=__team_sort_key))
+    team_positions = {team: i for i, team in enumerate(team_keys)}
+
+    counted = ~teams["surrogate"]
+    current = teams[played & counted].groupby("team_key")[["rp", "score"]].sum().reindex(team_keys, fill_value=0)
+    match_counts = teams[counted].groupby("team_key").size().reindex(team_keys, fill_value=0).to_numpy()
+
+    # (team, iteration) totals, starting from what has already been played
+    final_rp = np.repeat(current["rp"].to_numpy(dtype=float)[:, np.newaxis], iterations, axis=1)
+    final_score = np.repeat(current["score"].to_numpy(dtype=float)[:, np.newaxis], iterations, axis=1)
+
+    remaining = teams[~played]
+    remaining_numbers = sorted(remaining["match_number"].unique())
+    if remaining_numbers:
+        lineups = [__lineup(remaining[remaining["match_number"] == match_number]) for match_number in remaining_numbers]
+        outcomes = match_simulator.simulate_lineups(samples, lineups, iterations, rng, rules)
+
+        # (team, match) membership, so adding up every team's points is a matrix product
+        red_membership, blue_membership = __membership(remaining, remaining_numbers, team_positions)
+        final_rp += red_membership @ outcomes.red_rp + blue_membership @ outcomes.blue_rp
+        final_score += red_membership @ outcomes.red_score + blue_membership @ outcomes.blue_score
+
+    # The ranking score and first tiebreaker are averages over the matches that count
+    per_match = np.maximum(match_counts, 1)[:, np.newaxis]
+    ranking_score = final_rp / per_match
+    average_score = final_score / per_match
+
+    # Higher ranking score first, then average match points, then a coin flip
+    order = np.lexsort((rng.random(ranking_score.shape), -average_score, -ranking_score), axis=0)
+
+    ranks = np.empty_like(order)
+    np.put_along_axis(ranks, order, np.arange(1, len(team_keys) + 1)[:, np.newaxis], axis=0)
+
+    team_count = len(team_keys)
+    rank_counts = np.bincount(
+        (np.arange(team_count)[:, np.newaxis] * team_count + ranks - 1).ravel(), minlength=team_count * team_count
+    ).reshape(team_count, team_count)
+
+    summary = pd.DataFrame({
+        "team_key": team_keys,
+        "current_rp": current["rp"].to_numpy(),
+        "current_score": current["score"].to_numpy(),
+        "expected_rp": final_rp.mean(axis=1),
+        "expected_score": final_score.mean(axis=1),
+        "expected_ranking_score": ranking_score.mean(axis=1),
+        "mean_rank": ranks.mean(axis=1),
+        "median_rank": np.median(ranks, axis=1),
+        "best_rank": ranks.min(axis=1),
+        "worst_rank": ranks.max(axis=1),
+    })
+    for cutoff in TOP_RANK_CUTOFFS:
+        summary[f"top_{cutoff}_probability"] = (ranks <= cutoff).mean(axis=1)
+
+    rank_probabilities = pd.DataFrame(
+        rank_counts / iterations,
+        index=pd.Index(team_keys, name="team_key"),
+        columns=pd.Index(np.arange(1, len(team_keys) + 1), name="rank"),
+    )
+
+    return ProjectedRankings(
+        summary=summary.sort_values(["mean_rank", "team_key"]).reset_index(drop=True),
+        rank_probabilities=rank_probabilities,
+        remaining_matches=len(remaining_numbers),
+    )
+
+
+def __alliance_column(matches_df: pd.DataFrame, teams: pd.DataFrame, column: str, missing: float) -> np.ndarray:
+    """
+    Looks up a per-alliance column of the matches (i.e. "score_breakdown.{alliance}.rp") for every row of the long
+    team table.
+    """
+    by_alliance = matches_df.set_index("match_number")[[column.format(alliance=color) for color in ["red", "blue"]]]
+    by_alliance.columns = ["red", "blue"]
+
+    values = by_alliance.stack().reindex(pd.MultiIndex.from_arrays([teams["match_number"], teams["alliance"]]))
+    return values.fillna(missing).to_numpy(dtype=float)
+
+
+def __surrogate_flags(matches_df: pd.DataFrame, teams: pd.DataFrame) -> np.ndarray:
+    """
+    Whether each row of the long team table is a surrogate match for the team.
+    """
+    columns = [f"alliances.{color}.surrogate_team_keys" for color in ["red", "blue"]]
+    if not set(columns).issubset(matches_df.columns):
+        return np.zeros(len(teams), dtype=bool)
+
+    surrogates = {
+        (match_number, color, str(team).removeprefix("frc"))
+        for match_number, red, blue in matches_df[["match_number"] + columns].itertuples(index=False)
+        for color, team_keys in [("red", red), ("blue", blue)]
+        if team_keys is not None
+        for team in team_keys
+    }
+
+    return np.array(
+        [key in surrogates for key in zip(teams["match_number"], teams["alliance"], teams["team_key"])], dtype=bool
+    )
+
+
+def __lineup(match_teams: pd.DataFrame) -> MatchLineup:
+    return MatchLineup(
+        red_teams=tuple(match_teams.loc[match_teams["alliance"] == "red", "team_key"]),
+        blue_teams=tuple(match_teams.loc[match_teams["alliance"] == "blue", "team_key"]),
+    )
+
+
+def __membership(remaining: pd.DataFrame, remaining_numbers, team_positions):
+    """
+    (team, remaining match) -> 1 if the team plays the match for the alliance, and it isn't a surrogate match.
+    """
+    match_positions = {match_number: i for i, match_number in enumerate(remaining_numbers)}
+    counted = remaining[~remaining["surrogate"]]
+
+    memberships = []
+    for alliance in ["red", "blue"]:
+        rows = counted[counted["alliance"] == alliance]
+        membership = np.zeros((len(team_positions), len(remaining_numbers)))
+        membership[rows["team_key"].map(team_positions).to_numpy(), rows["match_number"].map(match_positions).to_numpy()] = 1
+        memberships.append(membership)
+
+    return memberships
+
+
+def __team_sort_key(team_key: str):
+    return (0, int(team_key), "") if team_key.isdigit() else (1, 0, team_key)
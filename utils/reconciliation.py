@@ -0,0 +1,246 @@
+from typing import Dict, NamedTuple, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+from utils.tba_utils import event_match_teams
+
+
+class ReconciledField(NamedTuple):
+    """
+    One number that is both scouted and in the TBA score breakdown.
+    """
+
+    # The scouted columns, added up over the alliance's robots
+    scouted: Sequence[str]
+
+    # The score breakdown fields that make up the official number. The ones in official_minus are subtracted, i.e.
+    # TBA reports the reef at the end of the match, so the coral scored in teleop is the end minus what auto left
+    official: Sequence[str]
+    official_minus: Sequence[str] = ()
+
+    # How far off the alliance total can be before it is flagged
+    tolerance: float = 1
+
+
+RECONCILED_FIELDS: Dict[str, ReconciledField] = {
+    "autoCoralL1": ReconciledField(["autoCoralL1"], ["autoReef.trough"]),
+    "autoCoralL2": ReconciledField(["autoCoralL2"], ["autoReef.tba_botRowCount"]),
+    "autoCoralL3": ReconciledField(["autoCoralL3"], ["autoReef.tba_midRowCount"]),
+    "autoCoralL4": ReconciledField(["autoCoralL4"], ["autoReef.tba_topRowCount"]),
+    "teleopCoralL1": ReconciledField(["teleopCoralL1"], ["teleopReef.trough"], ["autoReef.trough"], tolerance=2),
+    "teleopCoralL2": ReconciledField(["teleopCoralL2"], ["teleopReef.tba_botRowCount"], ["autoReef.tba_botRowCount"], tolerance=2),
+    "teleopCoralL3": ReconciledField(["teleopCoralL3"], ["teleopReef.tba_midRowCount"], ["autoReef.tba_midRowCount"], tolerance=2),
+    "teleopCoralL4": ReconciledField(["teleopCoralL4"], ["teleopReef.tba_topRowCount"], ["autoReef.tba_topRowCount"], tolerance=2),
+    # The human player can also score in the net, which isn't scouted
+    "netAlgae": ReconciledField(["autoAlgaeNet", "teleopAlgaeNet"], ["netAlgaeCount"], tolerance=2),
+    "processorAlgae": ReconciledField(["autoAlgaeProc", "teleopAlgaeProc"], ["wallAlgaeCount"]),
+    # The robot by robot barge check is exact, this only catches the big misses
+    "endgamePoints": ReconciledField(["endgamePoints"], ["endGameBargePoints"], tolerance=2),
+}
+
+# TBA endGameRobotN value -> the scouted bargeStatus
+TBA_BARGE_STATUS = {
+    "DeepCage": "Deep Cage",
+    "ShallowCage": "Shallow Cage",
+    "Parked": "Parked",
+    "None": "Not Parked",
+}
+
+# How strongly the team / scout biases are pulled toward zero. A team only plays ~10 matches, and the error of each
+# alliance is shared between three robots, so without this every team would get blamed for its partners' errors
+BIAS_RIDGE = 1.0
+
+
+class Reconciliation(NamedTuple):
+    """
+    Our scouting checked against the official TBA results.
+    """
+
+    # One row per played (match_number, alliance). The number of robots scouted, then for each RECONCILED_FIELDS the
+    # scouted total, the official total and the error (scouted - official). flagged alliances have an error outside
+    # the field's tolerance, which fields are listed in flagged_fields
+    alliances: pd.DataFrame
+
+    # One row per scouted robot in a played match. The scouted and official barge status and auto line, and whether
+    # they disagree. These are exact, so any disagreement is a scouting (or data entry) error
+    robots: pd.DataFrame
+
+    # team key x field -> how much the scouting over (or under) counts the team per match. Subtract it to correct
+    team_bias: pd.DataFrame
+
+    # The same by scout, if the scouting data says who scouted each robot
+    scout_bias: Optional[pd.DataFrame]
+
+
+def reconcile(df: pd.DataFrame, matches_df: pd.DataFrame, scout_column: Optional[str] = None) -> Reconciliation:
+    """
+    Compares the scouting data of the whole event against the TBA score breakdowns.
+
+    :param df: The scouting data, with derived columns already added
+    :param matches_df: The TBA qualification matches, as returned by tba_utils.load_event_matches
+    :param scout_column: The scouting data column that says who scouted the robot, if there is one
+    :return: The reconciliation
+    """
+    fields = list(RECONCILED_FIELDS)
+    scouted_columns = sorted({column for field in RECONCILED_FIELDS.values() for column in field.scouted})
+
+    if matches_df.empty:
+        # The schedule hasn't been released yet, so there is nothing to check against
+        return __empty_reconciliation(fields, scout_column is not None and scout_column in df.columns)
+
+    # A robot scouted twice counts once, with the average of the two
+    robot_keys = ["match_number", "alliance", "team_key"]
+    robots = df.groupby(robot_keys)[scouted_columns].mean()
+    per_alliance = robots.groupby(level=["match_number", "alliance"])
+
+    scouted = pd.DataFrame({
+        field: sum(per_alliance[column].sum() for column in RECONCILED_FIELDS[field].scouted) for field in fields
+    })
+    official = __official_totals(matches_df).reindex(columns=fields)
+
+    alliances = pd.DataFrame({"robots_scouted": per_alliance.size()}).join(official.add_suffix("_official"), how="inner")
+    errors = scouted.reindex(alliances.index) - official.reindex(alliances.index)
+    for field in fields:
+        alliances[f"{field}_scouted"] = scouted[field].reindex(alliances.index)
+        alliances[f"{field}_error"] = errors[field]
+
+    # An alliance with an unscouted robot will always come up short, so only complete alliances are flagged
+    tolerance = pd.Series({field: RECONCILED_FIELDS[field].tolerance for field in fields})
+    outside = errors.abs().gt(tolerance, axis=1) & (alliances["robots_scouted"] >= 3).to_numpy()[:, np.newaxis]
+    alliances["flagged"] = outside.any(axis=1)
+    alliances["flagged_fields"] = outside.apply(lambda row: ", ".join(row.index[row]), axis=1)
+
+    complete = alliances["robots_scouted"] >= 3
+    complete_robots = robots.reset_index()
+    complete_robots = complete_robots[
+        pd.MultiIndex.from_frame(complete_robots[["match_number", "alliance"]]).isin(alliances.index[complete])
+    ]
+
+    scout_bias = None
+    if scout_column is not None and scout_column in df.columns:
+        scouts = df.groupby(robot_keys)[scout_column].last().reindex(pd.MultiIndex.from_frame(complete_robots[robot_keys]))
+        scout_bias = __bias(complete_robots.assign(key=scouts.to_numpy()), errors[complete], fields)
+
+    return Reconciliation(
+        alliances=alliances,
+        robots=__reconcile_robots(df, matches_df),
+        team_bias=__bias(complete_robots.assign(key=complete_robots["team_key"]), errors[complete], fields),
+        scout_bias=scout_bias,
+    )
+
+
+def __empty_reconciliation(fields: Sequence[str], with_scouts: bool) -> Reconciliation:
+    alliance_columns = (
+        ["robots_scouted"]
+        + [f"{field}_official" for field in fields]
+        + [f"{field}_{kind}" for field in fields for kind in ["scouted", "error"]]
+        + ["flagged", "flagged_fields"]
+    )
+    alliances = pd.DataFrame(
+        columns=alliance_columns, index=pd.MultiIndex.from_tuples([], names=["match_number", "alliance"])
+    ).astype({"flagged": bool})
+
+    robots = pd.DataFrame(columns=[
+        "match_number",
+        "alliance",
+        "team_key",
+        "scouted_barge_status",
+        "scouted_left_zone",
+        "station",
+        "official_barge_status",
+        "official_left_zone",
+        "wrong_lineup",
+        "barge_mismatch",
+        "left_zone_mismatch",
+        "flagged",
+    ]).astype({"flagged": bool})
+
+    bias = pd.DataFrame(columns=list(fields), index=pd.Index([], name="key"))
+
+    scout_bias = bias.copy() if with_scouts else None
+    return Reconciliation(alliances=alliances, robots=robots, team_bias=bias, scout_bias=scout_bias)
+
+
+def __official_totals(matches_df: pd.DataFrame) -> pd.DataFrame:
+    """
+    :return: (match_number, alliance) x field official totals of every played match
+    """
+    per_alliance = []
+    for alliance in ["red", "blue"]:
+        breakdown = matches_df.set_index("match_number").filter(like=f"score_breakdown.{alliance}.")
+        breakdown.columns = breakdown.columns.str.removeprefix(f"score_breakdown.{alliance}.")
+
+        totals = pd.DataFrame({
+            field: breakdown[list(spec.official)].sum(axis=1, min_count=1) - breakdown[list(spec.official_minus)].sum(axis=1)
+            for field, spec in RECONCILED_FIELDS.items()
+        })
+        totals["alliance"] = alliance
+        per_alliance.append(totals.set_index("alliance", append=True))
+
+    # Matches that haven't been played don't have a score breakdown yet
+    return pd.concat(per_alliance).dropna(how="all").sort_index()
+
+
+def __reconcile_robots(df: pd.DataFrame, matches_df: pd.DataFrame) -> pd.DataFrame:
+    teams = event_match_teams(matches_df)
+
+    def station_value(field):
+        values = np.full(len(teams), None, dtype=object)
+        for alliance in ["red", "blue"]:
+            for station in range(1, 4):
+                column = f"score_breakdown.{alliance}.{field}{station}"
+                if column not in matches_df.columns:
+                    continue
+                lookup = matches_df.set_index("match_number")[column]
+                rows = ((teams["alliance"] == alliance) & (teams["station"] == station)).to_numpy()
+                values[rows] = lookup.reindex(teams.loc[rows, "match_number"]).to_numpy()
+        return values
+
+    teams["official_barge_status"] = pd.Series(station_value("endGameRobot"), index=teams.index).map(TBA_BARGE_STATUS)
+    teams["official_left_zone"] = pd.Series(station_value("autoLineRobot"), index=teams.index).map({"Yes": 1, "No": 0})
+    teams = teams.dropna(subset=["official_barge_status"])
+
+    robots = df[["match_number", "alliance", "team_key", "bargeStatus", "didLeaveStartingZone"]].merge(
+        teams[["match_number", "alliance", "team_key", "station", "official_barge_status", "official_left_zone"]],
+        on=["match_number", "alliance", "team_key"],
+        how="left",
+        indicator=True,
+    )
+    robots = robots.rename(columns={"bargeStatus": "scouted_barge_status", "didLeaveStartingZone": "scouted_left_zone"})
+
+    # Scouting a team that wasn't in the match, or on the wrong alliance, is an error too
+    robots["wrong_lineup"] = robots["_merge"] == "left_only"
+    robots["barge_mismatch"] = ~robots["wrong_lineup"] & (robots["scouted_barge_status"] != robots["official_barge_status"])
+    robots["left_zone_mismatch"] = ~robots["wrong_lineup"] & (robots["scouted_left_zone"] != robots["official_left_zone"])
+    robots["flagged"] = robots["wrong_lineup"] | robots["barge_mismatch"] | robots["left_zone_mismatch"]
+
+    # The unplayed matches are only in the scouting data as placeholders
+    played = set(teams["match_number"])
+    robots = robots[robots["match_number"].isin(played)].drop(columns="_merge")
+
+    return robots.sort_values(["match_number", "alliance", "station"], ascending=[True, False, True]).reset_index(drop=True)
+
+
+def __bias(robots: pd.DataFrame, errors: pd.DataFrame, fields: Sequence[str]) -> pd.DataFrame:
+    """
+    Splits each alliance's error between the robots in it, by solving for the per-key (team or scout) bias that best
+    explains all of the alliance errors at once. A ridge regression, so keys with few matches stay near zero.
+
+    :param robots: One row per scouted robot of a complete alliance, with match_number, alliance and key columns
+    :param errors: (match_number, alliance) x field errors of the complete alliances
+    """
+    keys, key_codes = np.unique(robots["key"].astype(str), return_inverse=True)
+    if len(keys) == 0 or errors.empty:
+        return pd.DataFrame(columns=fields, index=pd.Index([], name="key"))
+
+    alliance_codes = errors.index.get_indexer(pd.MultiIndex.from_frame(robots[["match_number", "alliance"]]))
+
+    # (alliance, key) -> how many of the alliance's robots the key accounts for
+    design = np.zeros((len(errors), len(keys)))
+    np.add.at(design, (alliance_codes, key_codes), 1)
+
+    target = errors[list(fields)].fillna(0).to_numpy(dtype=float)
+    bias = np.linalg.solve(design.T @ design + BIAS_RIDGE * np.eye(len(keys)), design.T @ target)
+
+    return pd.DataFrame(bias, index=pd.Index(keys, name="key"), columns=list(fields))
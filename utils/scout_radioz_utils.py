@@ -1,7 +1,11 @@
-import requests
+import io
 
+from utils import http_utils
 
-def __make_request(url: str, org_key: str, event_key: str) -> bytes:
+SCOUT_RADIOZ_URL = "https://scoutradioz.com"
+
+
+def __make_request(url: str, org_key: str, event_key: str, timeout) -> bytes:
 
     cookies = {
         "org_key": org_key,
@@ -11,19 +15,19 @@ def __make_request(url: str, org_key: str, event_key: str) -> bytes:
         "User-Agent": "Mozilla/5.0 (Windows; U; Windows NT 5.1; en-US; rv:1.9.0.7) Gecko/2009021910 Firefox/3.0.7",
     }
 
-    response = requests.get(url, cookies=cookies, headers=headers)
+    response = http_utils.get(url, cookies=cookies, headers=headers, timeout=timeout)
 
     return response.content
 
 
-def request_scout_radioz_match_scouting(org_key, event_key):
-    url = "https://scoutradioz.com/reports/exportdata?type=matchscouting"
+def request_scout_radioz_match_scouting(org_key, event_key, timeout=http_utils.DEFAULT_TIMEOUT):
+    url = f"{SCOUT_RADIOZ_URL}/reports/exportdata?type=matchscouting"
 
-    return __make_request(url, org_key, event_key)
+    return __make_request(url, org_key, event_key, timeout)
 
 
-def download_scout_radioz_match_scouting(org_key, event_key, output_file):
-    content = request_scout_radioz_match_scouting(org_key, event_key)
+def download_scout_radioz_match_scouting(org_key, event_key, output_file, timeout=http_utils.DEFAULT_TIMEOUT) -> bool:
+    content = request_scout_radioz_match_scouting(org_key, event_key, timeout)
 
     # If the download is empty, this means that the event likely hasn't started yet, so
     # we will fill in the important columns and add minimal mock data.
@@ -35,45 +39,24 @@ def download_scout_radioz_match_scouting(org_key, event_key, output_file):
         content = bytes(",".join(columns), "utf-8")
         content += b"\n,,,,,,,frc4237"
 
-    with open(output_file, "wb") as f:
-        f.write(content)
+    from utils import scouting_utils
 
-    if org_key == "frc8749":
+    if org_key in scouting_utils.MATCH_SCOUTING_RENAMES:
         import pandas as pd
 
-        df = pd.read_csv(output_file)
-
-        df.rename(
-            inplace=True,
-            columns={
-                "teleCoralL1": "teleopCoralL1",
-                "teleCoralL2": "teleopCoralL2",
-                "teleCoralL3": "teleopCoralL3",
-                "teleCoralL4": "teleopCoralL4",
-                "teleAlgaeNet": "teleopAlgaeNet",
-                "teleAlgaeProcessor": "teleopAlgaeProc",
-                "autoAlgaeNet": "autoAlgaeNet",
-                "autoAlgaeProcessor": "autoAlgaeProc",
-                "endgameBarge": "bargeStatus",
-            },
-        )
-        lookup = df[df["bargeStatus"] == "Hanging on Deep Cage"].index
-        df.loc[lookup, "bargeStatus"] = "Deep Cage"
-
-        lookup = df[df["bargeStatus"] == "Hanging on Shallow Cage"].index
-        df.loc[lookup, "bargeStatus"] = "Shallow Cage"
+        df = scouting_utils.normalize_match_scouting(pd.read_csv(io.BytesIO(content)))
+        content = bytes(df.to_csv(index=False), "utf-8")
 
-        df.to_csv(output_file, index=False)
+    return http_utils.write_if_changed(output_file, content)
 
 
-def request_scout_radioz_pit_scouting(org_key, event_key):
-    url = "https://scoutradioz.com/reports/exportdata?type=pitscouting"
+def request_scout_radioz_pit_scouting(org_key, event_key, timeout=http_utils.DEFAULT_TIMEOUT):
+    url = f"{SCOUT_RADIOZ_URL}/reports/exportdata?type=pitscouting"
 
-    return __make_request(url, org_key, event_key)
+    return __make_request(url, org_key, event_key, timeout)
 
 
-def download_scout_radioz_pit_scouting(org_key, event_key, output_file):
-    content = request_scout_radioz_pit_scouting(org_key, event_key)
+def download_scout_radioz_pit_scouting(org_key, event_key, output_file, timeout=http_utils.DEFAULT_TIMEOUT) -> bool:
+    content = request_scout_radioz_pit_scouting(org_key, event_key, timeout)
 
-    with open(output_file, "wb") as f:
-        f.write(content)
+    return http_utils.write_if_changed(output_file, content)
@@ -0,0 +1,313 @@
+import functools
+from pathlib import Path
+from typing import Optional
+
+import pandas as pd
+
+from utils.derived_metrics import ScoringTable, compute_derived_columns, scoring_table_for
+
+
+TEAM_AGGREGATE_STATS = ["mean", "median", "std", "count"]
+
+# ScoutRadioz org -> column renames for orgs whose match scouting form doesn't use our column names
+MATCH_SCOUTING_RENAMES = {
+    "frc8749": {
+        "teleCoralL1": "teleopCoralL1",
+        "teleCoralL2": "teleopCoralL2",
+        "teleCoralL3": "teleopCoralL3",
+        "teleCoralL4": "teleopCoralL4",
+        "teleAlgaeNet": "teleopAlgaeNet",
+        "teleAlgaeProcessor": "teleopAlgaeProc",
+        "autoAlgaeNet": "autoAlgaeNet",
+        "autoAlgaeProcessor": "autoAlgaeProc",
+        "endgameBarge": "bargeStatus",
+        "didStartingZone": "didLeaveStartingZone",
+    },
+}
+
+# The same for the values of the bargeStatus column
+BARGE_STATUS_RENAMES = {
+    "Hanging on Deep Cage": "Deep Cage",
+    "Hanging on Shallow Cage": "Shallow Cage",
+}
+
+# Every org has its own pit scouting form. This maps their column names onto a common set
+PIT_COLUMN_RENAMES = {
+    "Length": "driveBaseLength",
+    "Width": "driveBaseWidth",
+    "Weight": "robotWeight",
+    "driveBaseMultiSelect": "driveBaseType",
+    "scoreL1": "canScoreCoralL1",
+    "scoreL2": "canScoreCoralL2",
+    "scoreL3": "canScoreCoralL3",
+    "scoreL4": "canScoreCoralL4",
+    "canTheyScoreL1": "canScoreCoralL1",
+    "L2": "canScoreCoralL2",
+    "L3": "canScoreCoralL3",
+    "L4": "canScoreCoralL4",
+    "scoreProcessor": "canScoreAlgaeProcessor",
+    "scoreNet": "canScoreAlgaeNet",
+    "AlgaeProxesser": "canScoreAlgaeProcessor",
+    "AlgaeBarge": "canScoreAlgaeNet",
+    "pickUpSource": "canPickupCoralFeedstation",
+    "pickUpGround": "canPickupCoralGround",
+    "canPickupAlgaeground": "canPickupAlgaeGround",
+    "AlgaeFlooe": "canPickupAlgaeGround",
+    "AlgaeReed": "canPickupAlgaeReef",
+    "comments": "notes",
+    "comment": "notes",
+}
+
+# Yes / no questions on the pit scouting forms
+PIT_FLAG_PREFIXES = ("can", "do", "Start")
+
+# Free text answers that should be numbers
+PIT_MEASUREMENT_COLUMNS = [
+    "driveBaseLength",
+    "driveBaseWidth",
+    "robotHeight",
+    "robotWeight",
+    "DrivetrainQuality",
+    "electricalWiring",
+    "mechanicalQuality",
+]
+
+PIT_CAGE_CLIMB_VALUES = {
+    "Deep Climb": "Deep",
+    "Deep": "Deep",
+    "Shallow Climb": "Shallow",
+    "Shallow": "Shallow",
+    "Park": "Park",
+    "Cannot Climb": "None",
+}
+
+# The scouted averages that go next to the pit data in the team profiles
+PROFILE_METRICS = [
+    "totalPointsScored",
+    "totalAutoPoints",
+    "totalTeleopPoints",
+    "endgamePoints",
+    "totalAutoCoral",
+    "totalTeleopCoral",
+    "algaeAuto",
+    "algaeTeleop",
+]
+
+
+def add_derived_columns(df: pd.DataFrame, scoring_table: Optional[ScoringTable] = None) -> pd.DataFrame:
+    """
+    Adds the point totals and other helpful columns to the raw scouting data.
+
+    :param df: The raw scouting data, as downloaded from ScoutRadioz
+    :param scoring_table: How the season is scored. Defaults to the table for the year of the data
+    :return: The same data frame, with the new columns added
+    """
+    if scoring_table is None:
+        scoring_table = scoring_table_for(df)
+
+    derived = compute_derived_columns(df, scoring_table)
+    df[list(derived.columns)] = derived
+
+    return df
+
+
+def normalize_match_scouting(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Renames the columns (and values) of other orgs' match scouting exports to the ones our form uses, so that data
+    from every event can be processed and combined the same way.
+
+    :param df: The raw scouting data
+    :return: The data frame with MATCH_SCOUTING_RENAMES applied for the org that scouted it
+    """
+    if "org_key" not in df.columns or df.empty:
+        return df
+
+    renames = {}
+    for org_key in df["org_key"].dropna().unique():
+        renames.update(MATCH_SCOUTING_RENAMES.get(org_key, {}))
+    # Exports that were already normalized when they were downloaded have both the old and the new column
+    renames = {old: new for old, new in renames.items() if old in df.columns and new not in df.columns}
+
+    df = df.rename(columns=renames)
+    if "bargeStatus" in df.columns:
+        df["bargeStatus"] = df["bargeStatus"].replace(BARGE_STATUS_RENAMES)
+
+    return df
+
+
+def process_match_scouting(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Turns the raw ScoutRadioz export into the data frame the report uses.
+
+    :param df: The raw scouting data
+    :return: The data frame with derived columns, and team keys without the "frc" prefix
+    """
+    df = add_derived_columns(normalize_match_scouting(df))
+
+    # update team name
+    df["team_key"] = df["team_key"].str[3:]
+
+    return df
+
+
+def process_pit_scouting(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Turns the raw ScoutRadioz pit scouting export into the data frame the report uses. Every org has its own pit
+    scouting form, so the columns are renamed to PIT_COLUMN_RENAMES, the capability flags become booleans, and the
+    free text measurements (i.e. "113 w/o bumpers") become numbers.
+
+    :param df: The raw pit scouting data
+    :return: The data frame, with team keys without the "frc" prefix and one row per team
+    """
+    if df.empty:
+        return df
+
+    df = df.rename(columns=PIT_COLUMN_RENAMES)
+    df["team_key"] = df["team_key"].str[3:]
+
+    for column in df.select_dtypes(include=["object", "string"]).columns:
+        df[column] = df[column].str.strip()
+
+    for column in df.columns:
+        if column.startswith(PIT_FLAG_PREFIXES):
+            df[column] = pd.to_numeric(df[column], errors="coerce").astype("boolean")
+
+    for column in PIT_MEASUREMENT_COLUMNS:
+        if column in df.columns:
+            df[column] = __parse_measurement(df[column])
+
+    if "CageClimb" in df.columns:
+        df["CageClimb"] = df["CageClimb"].map(PIT_CAGE_CLIMB_VALUES).fillna(df["CageClimb"])
+
+    # Teams get re-scouted when they change their robot, the latest visit wins
+    return df.drop_duplicates(subset="team_key", keep="last").reset_index(drop=True)
+
+
+def __parse_measurement(column: pd.Series) -> pd.Series:
+    """
+    Pulls a number out of free text measurements. Feet and inches (3'6) become inches, and ranges (70-80) become
+    their middle.
+    """
+    text = column.astype("string")
+
+    feet_inches = text.str.extract(r"^(\d+)\s*['’]\s*(\d+(?:\.\d+)?)?")
+    inches = feet_inches[0].astype(float) * 12 + feet_inches[1].astype(float).fillna(0)
+
+    numbers = text.str.extract(r"(\d+(?:\.\d+)?)(?:\s*-\s*(\d+(?:\.\d+)?))?")
+    value = numbers[[0, 1]].astype(float).mean(axis=1)
+
+    return inches.where(feet_inches[0].notna(), value)
+
+
+def load_match_scouting(csv_file: Path) -> pd.DataFrame:
+    """
+    Loads a ScoutRadioz match scouting export and processes it with process_match_scouting. The result is cached
+    until the file changes, so everything that loads the same file shares a single pass over the data.
+
+    :param csv_file: The match_scouting.csv file
+    :return: The processed data frame. It is shared, so treat it as read only
+    """
+    csv_file = Path(csv_file).resolve()
+    return __load_match_scouting(csv_file, csv_file.stat().st_mtime_ns)
+
+
+@functools.lru_cache(maxsize=8)
+def __load_match_scouting(csv_file: Path, modified_time: int) -> pd.DataFrame:
+    return process_match_scouting(pd.read_csv(csv_file))
+
+
+def aggregate_by_team(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Aggregates every numeric column (raw and derived) of the scouting data by team. This only depends on the
+    scouting data, so it should be built once per data load rather than on every match selection.
+
+    :param df: The scouting data, with derived columns already added
+    :return: A data frame indexed by team_key, with (statistic, column) multi-index columns. Use i.e.
+        aggregates["mean"] to get the per-team averages of every column.
+    """
+    grouped = df.select_dtypes(include="number").groupby(df["team_key"])
+
+    return pd.concat({stat: grouped.agg(stat) for stat in TEAM_AGGREGATE_STATS}, axis=1)
+
+
+def update_team_aggregates(team_aggregates: pd.DataFrame, df: pd.DataFrame, teams) -> pd.DataFrame:
+    """
+    Brings the aggregates up to date after some teams got new scouting rows. Only those teams are aggregated
+    again, everyone else keeps their existing row.
+
+    :param team_aggregates: The aggregates, as returned by aggregate_by_team
+    :param df: All of the scouting data, including the new rows
+    :param teams: The team keys that have new rows
+    :return: The updated aggregates
+    """
+    teams = set(teams)
+    updated = aggregate_by_team(df[df["team_key"].isin(teams)])
+
+    unchanged = team_aggregates[~team_aggregates.index.isin(teams)]
+    return pd.concat([unchanged, updated.reindex(columns=team_aggregates.columns)]).sort_index()
+
+
+def team_averages(team_aggregates: pd.DataFrame, teams, fallback: Optional[pd.DataFrame] = None) -> pd.DataFrame:
+    """
+    Looks up the average stats for a list of teams, in the order they were given.
+
+    :param team_aggregates: The aggregates, as returned by aggregate_by_team
+    :param teams: The team keys to look up
+    :param fallback: Stand in rows for teams with no scouting data, with a team_key column, i.e. as returned by
+        component_opr.opr_scouting_rows
+    :return: A data frame with a team_key column. Teams with no scouting data (or fallback row) are filled with zeros
+    """
+    averages = team_aggregates["mean"].reindex(list(teams), fill_value=0)
+    if fallback is not None:
+        missing = ~averages.index.isin(team_aggregates.index)
+        stand_ins = fallback.set_index("team_key").reindex(index=averages.index[missing], columns=averages.columns)
+        averages.loc[missing] = stand_ins.fillna(0).to_numpy()
+    averages.index.name = "team_key"
+
+    return averages.reset_index()
+
+
+def add_fallback_rows(df: pd.DataFrame, fallback: Optional[pd.DataFrame]) -> pd.DataFrame:
+    """
+    Adds stand in rows for the teams with no scouting data, i.e. so a simulation plays them like their component
+    OPR rather than as a robot that does nothing.
+
+    :param df: The scouting data, with derived columns already added
+    :param fallback: Stand in rows with the same columns, i.e. as returned by component_opr.opr_scouting_rows. The
+        rows of teams that do have scouting data are ignored
+    :return: The scouting data with the stand in rows appended
+    """
+    if fallback is None:
+        return df
+
+    stand_ins = fallback[~fallback["team_key"].isin(df["team_key"])]
+    if stand_ins.empty:
+        return df
+
+    return pd.concat([df, stand_ins.reindex(columns=df.columns)], ignore_index=True)
+
+
+def build_team_profiles(team_aggregates: pd.DataFrame, pit_df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Joins the pit scouting data with the scouted averages, so that everything the report knows about a team is one
+    row lookup away.
+
+    :param team_aggregates: The aggregates, as returned by aggregate_by_team
+    :param pit_df: The pit scouting data, as returned by process_pit_scouting
+    :return: A data frame indexed by team_number, with the pit scouting columns, the number of scouted matches and
+        the PROFILE_METRICS averages. Teams that are only in one of the two have the other half missing
+    """
+    averages = team_aggregates["mean"].reindex(columns=PROFILE_METRICS)
+    averages.insert(0, "matchesScouted", team_aggregates["count"].max(axis=1).astype(int))
+    averages.index = pd.Index(averages.index.astype(int), name="team_number")
+
+    if pit_df.empty:
+        return averages.sort_index()
+
+    pit = pit_df.drop(columns=["org_key", "year", "event_key"], errors="ignore")
+    pit = pit.set_index(pit.pop("team_key").astype(int).rename("team_number"))
+
+    profiles = pit.join(averages, how="outer")
+    profiles["matchesScouted"] = profiles["matchesScouted"].fillna(0).astype(int)
+
+    return profiles
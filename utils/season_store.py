@@ -0,0 +1,202 @@
+from typing import Callable, List, NamedTuple, Optional, Sequence
+
+import pandas as pd
+
+
+# The scouted averages reported for every prior event
+HISTORY_METRICS = [
+    "totalPointsScored",
+    "totalAutoPoints",
+    "totalTeleopPoints",
+    "endgamePoints",
+    "totalAutoCoral",
+    "totalTeleopCoral",
+    "algaeAuto",
+    "algaeTeleop",
+]
+
+# Statbotics team event column -> the name used in the season store
+STATBOTICS_EPA_COLUMNS = {
+    "epa.breakdown.total_points": "epa",
+    "epa.breakdown.auto_points": "epa_auto",
+    "epa.breakdown.teleop_points": "epa_teleop",
+    "epa.breakdown.endgame_points": "epa_endgame",
+}
+STATBOTICS_TEAM_COLUMNS = {
+    **STATBOTICS_EPA_COLUMNS,
+    "record.qual.rank": "qual_rank",
+    "record.qual.num_teams": "qual_teams",
+    "record.qual.wins": "qual_wins",
+    "record.qual.losses": "qual_losses",
+}
+
+
+class SeasonStore(NamedTuple):
+    """
+    Everything we know about the season, across every event we have data for.
+    """
+
+    # Every scouted match, indexed by (team_number, event_key, match_number) and sorted, so that one team's history
+    # is a single slice of the index
+    matches: pd.DataFrame
+
+    # Statbotics' view of every team at every event, indexed by (team_number, event_key)
+    statbotics: pd.DataFrame
+
+    # The event keys, in the order they were played
+    events: List[str]
+
+
+def build_season_store(events: Sequence[str], load_frame: Callable[[str, str], pd.DataFrame]) -> SeasonStore:
+    """
+    Loads the scouting and Statbotics data of every event into one store.
+
+    :param events: The event keys to load
+    :param load_frame: Loads one of the event_cache data frames of an event, i.e. load_frame("2025paca", "match_scouting")
+    :return: The season store
+    """
+    match_frames, statbotics_frames = [], []
+    for event in events:
+        matches = load_frame(event, "match_scouting")
+        if not matches.empty:
+            match_frames.append(__index_matches(matches, event))
+
+        teams = load_frame(event, "statbotics_teams")
+        if not teams.empty:
+            statbotics_frames.append(__index_statbotics(teams, event))
+
+    matches = pd.concat(match_frames).sort_index() if match_frames else __empty_frame(["team_number", "event_key", "match_number"])
+    statbotics = pd.concat(statbotics_frames).sort_index() if statbotics_frames else __empty_frame(["team_number", "event_key"])
+
+    return SeasonStore(matches=matches, statbotics=statbotics, events=__event_order(events, statbotics))
+
+
+def __index_matches(matches: pd.DataFrame, event: str) -> pd.DataFrame:
+    # Events that haven't started have a placeholder row without a match
+    matches = matches.dropna(subset=["match_number"])
+    matches = matches.assign(
+        team_number=pd.to_numeric(matches["team_key"], errors="coerce"),
+        event_key=event,
+        match_number=matches["match_number"].astype(int),
+    ).dropna(subset=["team_number"])
+    matches["team_number"] = matches["team_number"].astype(int)
+
+    return matches.set_index(["team_number", "event_key", "match_number"])
+
+
+def __index_statbotics(teams: pd.DataFrame, event: str) -> pd.DataFrame:
+    statbotics = teams.reindex(columns=["team", "time", "week"] + list(STATBOTICS_TEAM_COLUMNS))
+    statbotics = statbotics.rename(columns=STATBOTICS_TEAM_COLUMNS).rename(columns={"team": "team_number"})
+    statbotics["event_key"] = event
+
+    return statbotics.set_index(["team_number", "event_key"])
+
+
+def __empty_frame(index_names) -> pd.DataFrame:
+    return pd.DataFrame(index=pd.MultiIndex.from_tuples([], names=index_names))
+
+
+def __event_order(events: Sequence[str], statbotics: pd.DataFrame) -> List[str]:
+    """
+    Sorts the events by when they started. Events Statbotics doesn't know about go last.
+    """
+    start_times = statbotics["time"].groupby(level="event_key").min() if "time" in statbotics else pd.Series(dtype=float)
+    return sorted(events, key=lambda event: (start_times.get(event, float("inf")), event))
+
+
+############################################
+# Queries
+############################################
+def team_history(store: SeasonStore, team_number: int, before_event: Optional[str] = None) -> pd.DataFrame:
+    """
+    Gets every scouted match of a team.
+
+    :param store: The season store
+    :param team_number: The team number
+    :param before_event: Only include the events played before this one, i.e. the current event
+    :return: The team's scouted matches, indexed by (event_key, match_number) in the order they were played
+    """
+    try:
+        history = store.matches.xs(team_number, level="team_number")
+    except KeyError:
+        return store.matches.iloc[:0].droplevel("team_number")
+
+    events = __prior_events(store, before_event)
+    history = history[history.index.get_level_values("event_key").isin(events)]
+
+    order = {event: i for i, event in enumerate(store.events)}
+    return history.iloc[history.index.get_level_values("event_key").map(order).argsort(kind="stable")]
+
+
+def team_event_summary(store: SeasonStore, team_number: int, before_event: Optional[str] = None) -> pd.DataFrame:
+    """
+    Summarizes a team's season, one row per event.
+
+    :param store: The season store
+    :param team_number: The team number
+    :param before_event: Only include the events played before this one, i.e. the current event
+    :return: A data frame indexed by event_key, in the order the events were played. The number of scouted matches,
+        the HISTORY_METRICS averages and the Statbotics numbers of the team at that event
+    """
+    history = team_history(store, team_number, before_event)
+    grouped = history.groupby(level="event_key", sort=False)
+
+    summary = grouped[HISTORY_METRICS].mean()
+    summary.insert(0, "matches_scouted", grouped.size())
+
+    try:
+        statbotics = store.statbotics.xs(team_number, level="team_number")[list(STATBOTICS_TEAM_COLUMNS.values())]
+        statbotics = statbotics[statbotics.index.isin(__prior_events(store, before_event))]
+        summary = summary.join(statbotics, how="outer")
+    except KeyError:
+        pass
+
+    order = {event: i for i, event in enumerate(store.events)}
+    summary = summary.iloc[summary.index.map(order).argsort(kind="stable")]
+    summary["matches_scouted"] = summary["matches_scouted"].fillna(0).astype(int)
+    summary.index.name = "event_key"
+
+    return summary
+
+
+def prescouting_table(store: SeasonStore, team_numbers: Sequence[int], current_event: str) -> pd.DataFrame:
+    """
+    Summarizes what the earlier events tell us about a set of teams, i.e. the teams at the current event.
+
+    :param store: The season store
+    :param team_numbers: The teams to summarize
+    :param current_event: The current event. Only the events played before it are used
+    :return: A data frame indexed by team_number. The number of earlier events and scouted matches, the
+        HISTORY_METRICS averages over every earlier scouted match, and the latest Statbotics numbers before the
+        current event. Teams we know nothing about have those missing
+    """
+    events = __prior_events(store, current_event)
+    team_numbers = pd.Index(list(team_numbers), name="team_number")
+
+    matches = store.matches[store.matches.index.get_level_values("event_key").isin(events)]
+    grouped = matches.groupby(level="team_number")
+
+    table = grouped[HISTORY_METRICS].mean()
+    table.insert(0, "matches_scouted", grouped.size())
+    team_events = matches.index.droplevel("match_number").unique()
+    table.insert(0, "events_scouted", team_events.get_level_values("team_number").value_counts())
+
+    statbotics = store.statbotics[store.statbotics.index.get_level_values("event_key").isin(events)].reset_index()
+    if not statbotics.empty:
+        statbotics["event_order"] = statbotics["event_key"].map({event: i for i, event in enumerate(store.events)})
+        latest = statbotics.sort_values("event_order").groupby("team_number").last()
+        latest = latest[["event_key"] + list(STATBOTICS_TEAM_COLUMNS.values())].rename(columns={"event_key": "latest_event"})
+        table = table.join(latest, how="outer")
+
+    table = table.reindex(team_numbers)
+    for column in ["events_scouted", "matches_scouted"]:
+        table[column] = table[column].fillna(0).astype(int)
+
+    return table
+
+
+def __prior_events(store: SeasonStore, before_event: Optional[str]) -> List[str]:
+    if before_event is None or before_event not in store.events:
+        return [event for event in store.events if event != before_event]
+
+    return store.events[: store.events.index(before_event)]
@@ -1,31 +1,57 @@
+import itertools
 import json
 from pathlib import Path
 import pandas as pd
 from typing import Dict, Any
 
+from utils import http_utils
+
+STATBOTICS_API_URL = "https://api.statbotics.io/v3"
+
 
 ############################################
 # Statbotics Matches
 ############################################
-def download_statbotics_matches(event: str, output_path: Path, quals_only=True):
+def download_statbotics_matches(
+    event: str, output_path: Path, quals_only=True, timeout=http_utils.DEFAULT_TIMEOUT
+) -> bool:
     """
     Queries the statbotics api for event info, and saves the json file to disk.
+
+    Completed matches do not change anymore, so if the file already exists only the matches after the last completed
+    one are requested, and merged into the existing data.
     :param event: The event key (i.e. 2024paca)
     :param output_path: The path to save the json to
     :param quals_only: If true, only data from qualification matches will be saved
+    :param timeout: Seconds to wait on statbotics before giving up
+    :return: True if the file changed
+    :raises requests.HTTPError: If statbotics did not send the data, the existing file is left alone
     """
-    import statbotics
+    completed = []
+    if output_path.exists():
+        with open(output_path, "r") as f:
+            stored = json.load(f)
+        # The offset counts matches in time order, so the completed ones have to come first
+        stored = sorted(stored, key=__match_order)
+        completed = list(itertools.takewhile(lambda m: m.get("status") == "Completed", stored))
+
+    url = f"{STATBOTICS_API_URL}/matches?event={event}&metric=time&ascending=True&limit=1000&offset={len(completed)}"
+    if quals_only:
+        url += "&elims=False"
 
-    sb = statbotics.Statbotics()
+    response = http_utils.get(url, timeout=timeout)
+    response.raise_for_status()
 
-    elims = False if quals_only else None
+    # Keyed on the match, so a match that shows up in both is only kept once, with the fresh data
+    merged = {match.get("key"): match for match in completed}
+    merged.update((match.get("key"), match) for match in response.json())
+    data = sorted(merged.values(), key=__match_order)
 
-    try:
-        data = sb.get_matches(event=event, elims=elims)
-        with open(output_path, "w") as f:
-            json.dump(data, f, indent=4)
-    except UserWarning:
-        print("Could not load statbotics match data")
+    return http_utils.write_json_if_changed(output_path, data)
+
+
+def __match_order(match: Dict[str, Any]):
+    return match.get("time") or 0, match.get("key") or ""
 
 
 def load_statbotics_matches(filename: Path) -> pd.DataFrame:
@@ -57,11 +83,14 @@ def statbotics_matches_json_to_dataframe(json_data: Dict[str, Any]) -> pd.DataFr
 ############################################
 # Statbotics Events
 ############################################
-def download_statbotics_event_teams(event: str, output_path: Path):
+def download_statbotics_event_teams(event: str, output_path: Path, timeout=http_utils.DEFAULT_TIMEOUT) -> bool:
     """
     Queries the API and downloads event data and saves the json response to disk.
     :param event: The event key (i.e. 2024paca)
     :param output_path: The location on disk to save the file
+    :param timeout: Seconds to wait on statbotics before giving up
+    :return: True if the file changed
+    :raises requests.HTTPError: If statbotics did not send the data, the existing file is left alone
     """
     # import statbotics
 
@@ -71,15 +100,12 @@ def download_statbotics_event_teams(event: str, output_path: Path):
     # with open(output_path, "w") as f:
     #     json.dump(data, f, indent=4)
 
-    import requests
-
-    url = f"https://api.statbotics.io/v3/team_events?event={event}"
+    url = f"{STATBOTICS_API_URL}/team_events?event={event}"
 
-    response = requests.get(url)
+    response = http_utils.get(url, timeout=timeout)
+    response.raise_for_status()
 
-    with open(output_path, "w") as f:
-        as_json = response.json()
-        json.dump(as_json, f, indent=4)
+    return http_utils.write_json_if_changed(output_path, response.json())
 
 
 def load_statbotics_teams(filename: Path):
@@ -1,11 +1,24 @@
+import functools
 import os
 import json
 from pathlib import Path
 
 import pandas as pd
-from typing import Dict, Any
+from typing import Any, Dict, Iterable, Iterator, List, Optional, TextIO
 
+from utils import http_utils
 
+TBA_API_URL = "https://www.thebluealliance.com/api/v3"
+
+ALLIANCE_COLORS = ["red", "blue"]
+TEAMS_PER_ALLIANCE = 3
+
+# The columns each match's teams are expanded into, i.e. red1 is the team key of the first red station
+TEAM_COLUMNS = [f"{color}{station}" for color in ALLIANCE_COLORS for station in range(1, TEAMS_PER_ALLIANCE + 1)]
+
+
+# The key doesn't change while we are running, no need to go back to the disk for every request
+@functools.lru_cache(maxsize=None)
 def __get_api_key():
     app_dir = Path(__file__).parent
     api_key_file = os.path.join(app_dir.parent, ".tba_key")
@@ -25,55 +38,223 @@ def __get_api_key():
     return api_key
 
 
-def __make_request(url):
+def __make_request(url, extra_headers: Optional[Dict[str, str]] = None, timeout=http_utils.DEFAULT_TIMEOUT):
     headers = {"X-TBA-Auth-Key": __get_api_key()}
+    if extra_headers:
+        headers.update(extra_headers)
 
-    import requests
+    response = http_utils.get(url, headers=headers, timeout=timeout)
+    response.raise_for_status()
 
-    response = requests.get(url, headers=headers)
-
-    return response.json()
+    return response
 
 
 def request_event_matches(event_key: str) -> Dict[str, Any]:
-    url = f"https://www.thebluealliance.com/api/v3/event/{event_key}/matches"
-    return __make_request(url)
+    url = f"{TBA_API_URL}/event/{event_key}/matches"
+    return __make_request(url).json()
+
+
+def download_tba_event_matches(event_key: str, output_file: Path, timeout=http_utils.DEFAULT_TIMEOUT) -> bool:
+    """
+    Downloads the matches for an event. The request is conditional on the ETag / Last-Modified of the previous
+    download, so TBA only sends the data if something changed.
+    :param event_key: The event key
+    :param output_file: The file to save the json to
+    :param timeout: Seconds to wait on TBA before giving up
+    :return: True if the file changed
+    """
+    url = f"{TBA_API_URL}/event/{event_key}/matches"
+    state = http_utils.load_download_state(output_file)
 
+    response = __make_request(url, http_utils.conditional_headers(state), timeout)
+    if response.status_code == 304:
+        print(f"TBA matches for {event_key} have not been modified")
+        return False
 
-def download_tba_event_matches(event_key: str, output_file: Path):
-    json_data = request_event_matches(event_key)
+    changed = http_utils.write_json_if_changed(output_file, response.json())
 
-    with open(output_file, "w") as f:
-        json.dump(json_data, f, indent=4)
+    # TBA hands out new validators for the same data every now and then. Only keeping the ones of data that changed
+    # stops that from turning into a data commit of its own
+    if changed:
+        http_utils.save_download_state(output_file, response.headers)
+
+    return changed
+
+
+# The parts of each match the report uses, as json_normalize style column names. The full payload is mostly the
+# state of every single reef node, which we never look at.
+SCORE_BREAKDOWN_FIELDS = [
+    "totalPoints",
+    "autoPoints",
+    "teleopPoints",
+    "foulPoints",
+    "rp",
+    "autoMobilityPoints",
+    "autoCoralCount",
+    "autoCoralPoints",
+    "teleopCoralCount",
+    "teleopCoralPoints",
+    "algaePoints",
+    "netAlgaeCount",
+    "wallAlgaeCount",
+    "endGameBargePoints",
+    "autoReef.trough",
+    "autoReef.tba_botRowCount",
+    "autoReef.tba_midRowCount",
+    "autoReef.tba_topRowCount",
+    "teleopReef.trough",
+    "teleopReef.tba_botRowCount",
+    "teleopReef.tba_midRowCount",
+    "teleopReef.tba_topRowCount",
+    "autoLineRobot1",
+    "autoLineRobot2",
+    "autoLineRobot3",
+    "endGameRobot1",
+    "endGameRobot2",
+    "endGameRobot3",
+    "autoBonusAchieved",
+    "coralBonusAchieved",
+    "bargeBonusAchieved",
+    "coopertitionCriteriaMet",
+]
+MATCH_FIELDS = [
+    "key",
+    "comp_level",
+    "match_number",
+    "actual_time",
+    "alliances.red.score",
+    "alliances.blue.score",
+    "alliances.red.team_keys",
+    "alliances.blue.team_keys",
+    "alliances.red.surrogate_team_keys",
+    "alliances.blue.surrogate_team_keys",
+] + [f"score_breakdown.{color}.{field}" for color in ["red", "blue"] for field in SCORE_BREAKDOWN_FIELDS]
 
 
 def load_event_matches(json_file: Path) -> pd.DataFrame:
     with open(json_file, "r") as f:
-        json_data = json.load(f)
+        return stream_event_matches(f)
+
+
+def stream_event_matches(f: TextIO) -> pd.DataFrame:
+    """
+    Parses the qualification matches out of a TBA matches json file one match at a time, only keeping MATCH_FIELDS.
+    Unlike json.load + json_normalize, the whole payload never has to be in memory as python objects at once.
+    :param f: The json file (or anything file-like, i.e. the result of pyodide's open_url)
+    :return: The matches data frame
+    """
+    return __matches_to_dataframe(
+        __extract_match_fields(match) for match in __iter_json_array(f) if match.get("comp_level") == "qm"
+    )
+
+
+def event_matches_json_to_dataframe(json_data: List[Dict[str, Any]]) -> pd.DataFrame:
+    """
+    Converts already-parsed TBA matches json into the matches data frame.
+    :param json_data: The json data
+    :return: The matches data frame
+    """
+    return __matches_to_dataframe(
+        __extract_match_fields(match) for match in json_data if match.get("comp_level") == "qm"
+    )
 
-    return event_matches_json_to_dataframe(json_data)
 
+def __iter_json_array(f: TextIO, chunk_size: int = 64 * 1024) -> Iterator[Any]:
+    """
+    Yields the elements of a top level json array, reading the file in chunks.
+    """
+    decoder = json.JSONDecoder()
+    buffer = ""
 
-def event_matches_json_to_dataframe(json_data: Dict[str, Any]) -> pd.DataFrame:
-    raw_df = pd.json_normalize(json_data)
+    def fill(buffer):
+        buffer = buffer.lstrip()
+        while not buffer:
+            chunk = f.read(chunk_size)
+            if not chunk:
+                raise ValueError("Unexpected end of json array")
+            buffer = chunk.lstrip()
+        return buffer
+
+    buffer = fill(buffer)
+    if buffer[0] != "[":
+        raise ValueError("Expected a json array")
+    buffer = buffer[1:]
+
+    while True:
+        buffer = fill(buffer)
+        if buffer[0] == "]":
+            return
+        if buffer[0] == ",":
+            buffer = fill(buffer[1:])
+
+        try:
+            element, end = decoder.raw_decode(buffer)
+        except json.JSONDecodeError:
+            # The element doesn't fit in the buffer yet
+            chunk = f.read(chunk_size)
+            if not chunk:
+                raise
+            buffer += chunk
+            continue
+
+        yield element
+        buffer = buffer[end:]
+
+
+def __extract_match_fields(match: Dict[str, Any]) -> Dict[str, Any]:
+    record = {}
+    for field in MATCH_FIELDS:
+        value = match
+        for part in field.split("."):
+            value = value.get(part) if isinstance(value, dict) else None
+        record[field] = value
+
+    return record
+
+
+def __matches_to_dataframe(records: Iterable[Dict[str, Any]]) -> pd.DataFrame:
+    raw_df = pd.DataFrame.from_records(list(records), columns=MATCH_FIELDS)
 
     if raw_df.empty:
+        # i.e. before the schedule is released. Keep the columns, so the code using the matches doesn't need to check
         print("TBA Events DF is empty!")
-        return pd.DataFrame()
+        return raw_df.reindex(columns=MATCH_FIELDS + TEAM_COLUMNS)
+
+    # We like to be able to simply query teams. By default, they are embedded in the dataframe as a list, so expand
+    # each alliance's list into its own columns in one go
+    team_columns = [
+        pd.DataFrame(
+            raw_df[f"alliances.{color}.team_keys"].tolist(),
+            index=raw_df.index,
+            columns=[f"{color}{station}" for station in range(1, TEAMS_PER_ALLIANCE + 1)],
+        )
+        for color in ALLIANCE_COLORS
+    ]
+
+    return pd.concat([raw_df] + team_columns, axis=1)
+
 
-    # Filter out elims matches for our purposes
-    raw_df = raw_df[raw_df["comp_level"] == "qm"]
+def event_match_teams(matches_df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Reshapes the matches into one row per team per match, which makes it a plain merge to join them against the
+    scouting data (or anything else keyed by team).
+    :param matches_df: The matches data frame, as returned by load_event_matches
+    :return: A data frame with match_number, alliance ("red" / "blue"), station (1-3), team_key (i.e. "4467", the
+             same format as the scouting data) and team_number. Teams without a plain number, like the B teams at
+             offseason events, get a missing team_number
+    """
+    if matches_df.empty:
+        return pd.DataFrame(columns=["match_number", "alliance", "station", "team_key", "team_number"])
 
-    # We like to be able to simply query teams. By default, they are embedded in the dataframe as a list
-    red_teams = raw_df["alliances.red.team_keys"]
-    blue_teams = raw_df["alliances.blue.team_keys"]
+    teams = matches_df.melt(id_vars="match_number", value_vars=TEAM_COLUMNS, var_name="position", value_name="team_key")
 
-    # TODO(pj) There is surely a better way
-    raw_df["red1"] = [t[0] for t in red_teams]
-    raw_df["red2"] = [t[1] for t in red_teams]
-    raw_df["red3"] = [t[2] for t in red_teams]
-    raw_df["blue1"] = [t[0] for t in blue_teams]
-    raw_df["blue2"] = [t[1] for t in blue_teams]
-    raw_df["blue3"] = [t[2] for t in blue_teams]
+    teams["alliance"] = teams["position"].str[:-1]
+    teams["station"] = teams["position"].str[-1].astype(int)
+    teams["team_key"] = teams["team_key"].str.removeprefix("frc")
+    teams["team_number"] = pd.to_numeric(teams["team_key"], errors="coerce").astype("Int64")
 
-    return raw_df
+    return (
+        teams[["match_number", "alliance", "station", "team_key", "team_number"]]
+        .sort_values(["match_number", "alliance", "station"], ascending=[True, False, True])
+        .reset_index(drop=True)
+    )
@@ -0,0 +1,145 @@
+from typing import Dict, Set, Tuple
+
+import numpy as np
+import pandas as pd
+
+
+# rating component -> the scouted points column it rates. Together they add up to totalPointsScored
+RATING_COMPONENTS = {
+    "auto": "totalAutoPoints",
+    "teleop_coral": "totalTeleopCoralPoints",
+    "algae": "totalTeleopAlgaePoints",
+    "endgame": "endgamePoints",
+}
+
+# How much each new match moves the rating. With ~10 qualification matches, 0.3 puts about two thirds of the weight
+# on the last three matches
+RATING_ALPHA = 0.3
+
+# How much each new match moves the trend, in points per match
+TREND_BETA = 0.2
+
+RATING_COLUMNS = (
+    ["matches"]
+    + [f"{component}_{kind}" for kind in ["rating", "ewma", "trend"] for component in RATING_COMPONENTS]
+    + ["total_rating", "total_ewma", "total_trend"]
+)
+
+
+class TeamRatings:
+    """
+    Recency weighted ratings of every team's scoring, built from our own scouting. Robots get better (or break)
+    over the course of an event, so unlike a plain average the later matches count for more.
+
+    Each component is tracked with double exponential smoothing: a level, which is the exponentially weighted
+    average of the team's matches, and a trend, which is how fast that level has been moving per match. The rating
+    is the level plus one match of trend, i.e. what we expect from the team in their next match.
+
+    The ratings only depend on the matches seen so far, so new scouting rows are folded in with update() without
+    going over the old ones again. Only a row for an earlier match than the team's latest one (i.e. a scout catching
+    up on a match they missed) makes that team's ratings get redone from their history.
+    """
+
+    def __init__(self, alpha: float = RATING_ALPHA, beta: float = TREND_BETA):
+        """
+        :param alpha: The smoothing factor of the level
+        :param beta: The smoothing factor of the trend
+        """
+        self.alpha = alpha
+        self.beta = beta
+
+        # team key -> (matches, level, trend), one entry per RATING_COMPONENTS in the arrays
+        self.__state: Dict[str, Tuple[int, np.ndarray, np.ndarray]] = {}
+
+        # team key -> match number -> the RATING_COMPONENTS points of the rated row
+        self.__history: Dict[str, Dict[int, np.ndarray]] = {}
+        self.__latest_match: Dict[str, int] = {}
+
+    def update(self, df: pd.DataFrame) -> int:
+        """
+        Folds new scouting rows into the ratings, in match order. Only the first row for each (team, match) is
+        rated, so a robot scouted twice counts once, and passing the whole data frame again is harmless. Either way
+        the ratings are the same as compute_team_ratings on all of the rows at once.
+
+        :param df: The new scouting rows, with derived columns already added
+        :return: The number of rows that were applied
+        """
+        team_keys = df["team_key"].astype(str).to_numpy()
+        match_numbers = df["match_number"].astype(int).to_numpy()
+        values = df[list(RATING_COMPONENTS.values())].to_numpy(dtype=float)
+
+        new_rows = []
+        for team, match_number, points in zip(team_keys, match_numbers.tolist(), values):
+            history = self.__history.setdefault(team, {})
+            if match_number not in history:
+                history[match_number] = points
+                new_rows.append((match_number, team))
+
+        # Teams that got a row for an earlier match than one already rated are redone from the start
+        stale: Set[str] = set()
+        for match_number, team in sorted(new_rows, key=lambda row: row[0]):
+            if team in stale:
+                continue
+            if match_number < self.__latest_match.get(team, match_number):
+                stale.add(team)
+                continue
+            self.__apply(team, self.__history[team][match_number])
+            self.__latest_match[team] = match_number
+
+        for team in stale:
+            del self.__state[team]
+            for match_number in sorted(self.__history[team]):
+                self.__apply(team, self.__history[team][match_number])
+            self.__latest_match[team] = match_number
+
+        return len(new_rows)
+
+    def __apply(self, team: str, points: np.ndarray):
+        if team not in self.__state:
+            # The first match sets the level, there is no trend yet
+            self.__state[team] = (1, points.copy(), np.zeros_like(points))
+            return
+
+        matches, level, trend = self.__state[team]
+        new_level = self.alpha * points + (1 - self.alpha) * (level + trend)
+        new_trend = self.beta * (new_level - level) + (1 - self.beta) * trend
+
+        self.__state[team] = (matches + 1, new_level, new_trend)
+
+    def table(self) -> pd.DataFrame:
+        """
+        :return: A data frame indexed by team_key with RATING_COLUMNS. For each component (and their total) the
+            rating, the exponentially weighted average and the trend per match
+        """
+        if not self.__state:
+            return pd.DataFrame(columns=RATING_COLUMNS, index=pd.Index([], name="team_key"))
+
+        team_keys = sorted(self.__state, key=lambda team: (not team.isdigit(), int(team) if team.isdigit() else 0, team))
+        matches = np.array([self.__state[team][0] for team in team_keys])
+        levels = np.array([self.__state[team][1] for team in team_keys])
+        trends = np.array([self.__state[team][2] for team in team_keys])
+
+        table = {"matches": matches}
+        for kind, values in [("rating", levels + trends), ("ewma", levels), ("trend", trends)]:
+            for i, component in enumerate(RATING_COMPONENTS):
+                table[f"{component}_{kind}"] = values[:, i]
+
+        for kind, values in [("rating", levels + trends), ("ewma", levels), ("trend", trends)]:
+            table[f"total_{kind}"] = values.sum(axis=1)
+
+        return pd.DataFrame(table, index=pd.Index(team_keys, name="team_key"))[RATING_COLUMNS]
+
+
+def compute_team_ratings(df: pd.DataFrame, alpha: float = RATING_ALPHA, beta: float = TREND_BETA) -> TeamRatings:
+    """
+    Rates every team from scratch.
+
+    :param df: The scouting data, with derived columns already added
+    :param alpha: The smoothing factor of the level
+    :param beta: The smoothing factor of the trend
+    :return: The ratings. Call update() on them with new scouting rows as they come in
+    """
+    ratings = TeamRatings(alpha, beta)
+    ratings.update(df)
+
+    return ratings
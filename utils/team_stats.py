@@ -0,0 +1,174 @@
+from typing import Sequence
+
+import numpy as np
+import pandas as pd
+
+
+# A team only plays 8-12 qualification matches, and every so often one of them is mis-scouted. These are the
+# statistics reported for each metric, on top of the plain mean.
+TEAM_STATS = ["count", "mean", "median", "trimmed_mean", "std", "ci_low", "ci_high"]
+
+# The metrics the statistics are computed for by default
+TEAM_STAT_METRICS = [
+    "totalPointsScored",
+    "totalAutoPoints",
+    "totalTeleopPoints",
+    "endgamePoints",
+    "endgamePlusAuto",
+    "totalPieces",
+    "totalAutoCoral",
+    "totalTeleopCoral",
+    "algaeAuto",
+    "algaeTeleop",
+    "autoCoralL1",
+    "autoCoralL2",
+    "autoCoralL3",
+    "autoCoralL4",
+    "teleopCoralL1",
+    "teleopCoralL2",
+    "teleopCoralL3",
+    "teleopCoralL4",
+    "teleopAlgaeNet",
+    "teleopAlgaeProc",
+]
+
+# The fraction of matches dropped from each end before averaging, i.e. the best and worst match out of ten
+TRIM_PROPORTION = 0.1
+
+# The confidence intervals are percentile bootstrap intervals of the trimmed mean
+BOOTSTRAP_SAMPLES = 1000
+CONFIDENCE_LEVEL = 0.9
+
+# How many (team, sample, match, metric) values the bootstrap works on at once
+BOOTSTRAP_CHUNK_ELEMENTS = 2_000_000
+
+def compute_team_stats(
+    df: pd.DataFrame,
+    metrics: Sequence[str] = tuple(TEAM_STAT_METRICS),
+    trim_proportion: float = TRIM_PROPORTION,
+    bootstrap_samples: int = BOOTSTRAP_SAMPLES,
+    confidence_level: float = CONFIDENCE_LEVEL,
+    seed: int = 0,
+) -> pd.DataFrame:
+    """
+    Computes TEAM_STATS for every team and metric. All of the teams, metrics and bootstrap samples are computed
+    together as numpy arrays, so this stays fast enough to run while the app is loading.
+
+    :param df: The scouting data, with derived columns already added
+    :param metrics: The columns to compute the statistics of
+    :param trim_proportion: The fraction of matches to drop from each end for the trimmed mean
+    :param bootstrap_samples: How many times to resample each team's matches for the confidence intervals
+    :param confidence_level: The coverage of the confidence intervals
+    :param seed: The seed of the bootstrap resampling, so the same data always gives the same intervals
+    :return: A data frame indexed by team_key, with (statistic, metric) multi-index columns, like
+        scouting_utils.aggregate_by_team. Use i.e. stats["trimmed_mean"] to get one statistic for every metric.
+    """
+    metrics = list(metrics)
+    values, team_keys = __team_sample_matrix(df, metrics)
+    valid = ~np.isnan(values)
+
+    counts = valid.sum(axis=1)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        stats = {
+            "count": counts.astype(float),
+            "mean": np.nanmean(values, axis=1),
+            "median": np.nanmedian(values, axis=1),
+            "trimmed_mean": __trimmed_mean(np.sort(values, axis=1), counts[:, np.newaxis, :], trim_proportion)[:, 0],
+            "std": np.nanstd(values, axis=1, ddof=1),
+        }
+
+    stats["ci_low"], stats["ci_high"] = __bootstrap_interval(
+        values, trim_proportion, bootstrap_samples, confidence_level, np.random.default_rng(seed)
+    )
+
+    index = pd.Index(team_keys, name="team_key")
+    return pd.concat({stat: pd.DataFrame(stats[stat], index=index, columns=metrics) for stat in TEAM_STATS}, axis=1)
+
+
+def __team_sample_matrix(df: pd.DataFrame, metrics: Sequence[str]):
+    """
+    Lays the scouting rows out as a (team, match, metric) array. Teams with fewer matches are padded with NaN.
+    """
+    team_codes, team_keys = pd.factorize(df["team_key"], sort=True)
+    slots = df.groupby(team_codes).cumcount().to_numpy()
+
+    values = np.full((len(team_keys), slots.max() + 1 if len(slots) else 0, len(metrics)), np.nan)
+    values[team_codes, slots] = df[metrics].to_numpy(dtype=float)
+
+    return values, list(team_keys)
+
+
+def __trimmed_mean(sorted_values: np.ndarray, counts: np.ndarray, trim_proportion: float) -> np.ndarray:
+    """
+    Trimmed mean along axis 1 of (team, sample, match, metric) values that are sorted with NaN last.
+    :param counts: (team, sample or 1, metric) number of non-NaN matches
+    """
+    trim = np.floor(counts * trim_proportion)[:, :, np.newaxis, :]
+    position = np.arange(sorted_values.shape[1])[np.newaxis, np.newaxis, :, np.newaxis]
+    kept = (position >= trim) & (position < counts[:, :, np.newaxis, :] - trim)
+
+    total = np.where(kept, sorted_values[:, np.newaxis], 0).sum(axis=2)
+    return total / kept.sum(axis=2)
+
+
+def __bootstrap_interval(values, trim_proportion, bootstrap_samples, confidence_level, rng):
+    """
+    Percentile bootstrap interval of the trimmed mean of each team and metric.
+
+    Instead of materializing every resampled match, each resample is described by how many times it drew each of
+    the team's matches. The trimmed mean of a resample is then a weighted sum over the sorted matches, where each
+    match's weight is the part of its draws that survives the trimming.
+    """
+    team_count, match_count, metric_count = values.shape
+    if match_count == 0 or bootstrap_samples <= 0:
+        return np.full((team_count, metric_count), np.nan), np.full((team_count, metric_count), np.nan)
+
+    # Resample the rows each team actually has, a row missing one metric simply doesn't count toward it
+    rows = (~np.isnan(values)).any(axis=2).sum(axis=1)
+    draws = np.floor(rng.random((team_count, bootstrap_samples, match_count)) * rows[:, np.newaxis, np.newaxis])
+    drawn = np.broadcast_to(np.arange(match_count) < rows[:, np.newaxis, np.newaxis], draws.shape)
+
+    # (team, sample, match) -> how many times the match was drawn
+    offsets = np.arange(team_count * bootstrap_samples).reshape(team_count, bootstrap_samples, 1) * match_count
+    draw_counts = np.bincount(
+        (offsets + draws.astype(np.intp))[drawn], minlength=team_count * bootstrap_samples * match_count
+    ).reshape(team_count, bootstrap_samples, match_count).astype(np.int16)
+
+    # Done a few teams at a time, so the (team, sample, match, metric) arrays stay a reasonable size
+    chunk_size = max(1, BOOTSTRAP_CHUNK_ELEMENTS // (bootstrap_samples * match_count * metric_count))
+    trimmed_means = np.concatenate([
+        __bootstrap_trimmed_means(values[i : i + chunk_size], draw_counts[i : i + chunk_size], trim_proportion)
+        for i in range(0, team_count, chunk_size)
+    ])
+
+    # Teams that never recorded a metric have no interval
+    alpha = (1 - confidence_level) / 2
+    ci_low, ci_high = np.quantile(trimmed_means, [alpha, 1 - alpha], axis=1)
+
+    return ci_low, ci_high
+
+
+def __bootstrap_trimmed_means(values, draw_counts, trim_proportion):
+    """
+    :param values: (team, match, metric) values, NaN where missing
+    :param draw_counts: (team, sample, match) number of times each match was drawn
+    :return: (team, sample, metric) trimmed mean of each resample
+    """
+    # NaN sorts last, so each team and metric has its valid matches first
+    order = np.argsort(values, axis=1)
+    sorted_values = np.take_along_axis(values, order, axis=1)
+    sorted_valid = ~np.isnan(sorted_values)
+    sorted_values = np.nan_to_num(sorted_values)
+
+    # (team, sample, sorted match, metric)
+    weights = np.take_along_axis(draw_counts[:, :, :, np.newaxis], order[:, np.newaxis], axis=2)
+    weights *= sorted_valid[:, np.newaxis]
+
+    cumulative = np.cumsum(weights, axis=2, dtype=weights.dtype)
+    counts = cumulative[:, :, -1:, :]
+    trim = np.floor(counts * trim_proportion).astype(cumulative.dtype)
+
+    kept = np.clip(cumulative, trim, counts - trim) - np.clip(cumulative - weights, trim, counts - trim)
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.einsum("tsmk,tmk->tsk", kept, sorted_values) / kept.sum(axis=2)